@@ -0,0 +1,227 @@
+import os
+import glob
+import base64
+import time
+import sqlite3
+import cv2
+from matching import UNKNOWN_NAME
+
+APPEARANCES_SUFFIX = ".faces.db"
+DEFAULT_MAX_GAP = 1.0  # seconds a face may be missing before a new interval starts
+THUMBNAIL_SIZE = 128
+
+SCHEMA = """
+CREATE TABLE video (path TEXT, output TEXT, frame_rate REAL, frames INTEGER, processed_at REAL);
+CREATE TABLE identity (
+    name TEXT PRIMARY KEY, first_seen REAL, last_seen REAL, seconds REAL,
+    best_frame INTEGER, best_time REAL, best_confidence REAL, best_box TEXT, thumbnail BLOB
+);
+CREATE TABLE interval (name TEXT, start REAL, end REAL);
+CREATE INDEX interval_name ON interval (name);
+"""
+
+
+def default_appearances_path(output_video_path):
+    return os.path.splitext(output_video_path)[0] + APPEARANCES_SUFFIX
+
+
+def _thumbnail(frame, face_location):
+    top, right, bottom, left = face_location
+    crop = frame[max(0, top):bottom, max(0, left):right]
+    if crop.size == 0:
+        return None
+    scale = THUMBNAIL_SIZE / max(crop.shape[:2])
+    if scale < 1:
+        crop = cv2.resize(crop, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return buffer.tobytes()
+
+
+class AppearanceIndex:
+    # When each known identity is on screen in a video: merged time intervals,
+    # first/last seen and the best-confidence frame with a thumbnail. Built
+    # while the video is processed and saved as a small SQLite file next to the
+    # output, so "when did X appear" is a lookup instead of a reprocessing job.
+
+    def __init__(self, frame_rate, max_gap=DEFAULT_MAX_GAP):
+        self.frame_rate = frame_rate if frame_rate and frame_rate > 0 else 25.0
+        self.max_gap = max_gap
+        self.frames = 0
+        self.identities = {}
+
+    def add(self, frame_number, frame, face_locations, matches):
+        # Call before the frame is drawn on, the thumbnail is cut from it
+        self.frames = max(self.frames, frame_number)
+        time_seen = (frame_number - 1) / self.frame_rate
+        for face_location, match in zip(face_locations, matches):
+            if match.name == UNKNOWN_NAME:
+                continue
+            identity = self.identities.get(match.name)
+            if identity is None:
+                identity = self.identities[match.name] = {"intervals": [], "best_confidence": -1.0}
+            intervals = identity["intervals"]
+            # Frame gaps up to max_gap (e.g. skipped detections) join one interval
+            if intervals and time_seen - intervals[-1][1] <= self.max_gap:
+                intervals[-1][1] = time_seen
+            else:
+                intervals.append([time_seen, time_seen])
+            if match.confidence > identity["best_confidence"]:
+                identity.update({
+                    "best_confidence": match.confidence,
+                    "best_frame": frame_number,
+                    "best_time": time_seen,
+                    "best_box": face_location,
+                    "thumbnail": _thumbnail(frame, face_location),
+                })
+
+    def merge(self, other):
+        # Adds another index of the same video, e.g. of a later segment
+        self.frames = max(self.frames, other.frames)
+        for name, theirs in other.identities.items():
+            ours = self.identities.get(name)
+            if ours is None:
+                self.identities[name] = {**theirs, "intervals": [list(interval) for interval in theirs["intervals"]]}
+                continue
+            intervals = []
+            for start, end in sorted(ours["intervals"] + theirs["intervals"]):
+                if intervals and start - intervals[-1][1] <= self.max_gap:
+                    intervals[-1][1] = max(intervals[-1][1], end)
+                else:
+                    intervals.append([start, end])
+            ours["intervals"] = intervals
+            if theirs["best_confidence"] > ours["best_confidence"]:
+                ours.update({key: value for key, value in theirs.items() if key != "intervals"})
+
+    def to_state(self):
+        # JSON friendly state for checkpoints
+        identities = {}
+        for name, identity in self.identities.items():
+            identity = dict(identity)
+            identity["best_box"] = list(identity["best_box"])
+            if identity["thumbnail"] is not None:
+                identity["thumbnail"] = base64.b64encode(identity["thumbnail"]).decode("ascii")
+            identities[name] = identity
+        return {"frame_rate": self.frame_rate, "max_gap": self.max_gap, "frames": self.frames, "identities": identities}
+
+    @classmethod
+    def from_state(cls, state):
+        appearances = cls(state["frame_rate"], state["max_gap"])
+        appearances.frames = state["frames"]
+        for name, identity in state["identities"].items():
+            identity = dict(identity)
+            identity["best_box"] = tuple(identity["best_box"])
+            if identity["thumbnail"] is not None:
+                identity["thumbnail"] = base64.b64decode(identity["thumbnail"])
+            appearances.identities[name] = identity
+        return appearances
+
+    @classmethod
+    def load(cls, path, max_gap=DEFAULT_MAX_GAP):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            frame_rate, frames = connection.execute("SELECT frame_rate, frames FROM video").fetchone()
+            appearances = cls(frame_rate, max_gap)
+            appearances.frames = frames
+            rows = connection.execute(
+                "SELECT name, best_frame, best_time, best_confidence, best_box, thumbnail FROM identity"
+            ).fetchall()
+            for name, best_frame, best_time, best_confidence, best_box, thumbnail in rows:
+                intervals = connection.execute("SELECT start, end FROM interval WHERE name = ? ORDER BY start", (name,)).fetchall()
+                appearances.identities[name] = {
+                    "intervals": [list(interval) for interval in intervals],
+                    "best_confidence": best_confidence,
+                    "best_frame": best_frame,
+                    "best_time": best_time,
+                    "best_box": tuple(int(value) for value in best_box.split(",")),
+                    "thumbnail": thumbnail,
+                }
+        finally:
+            connection.close()
+        return appearances
+
+    def save(self, path, video_path=None, output_video_path=None):
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        # Written to a temporary file first, a reader never sees a half-written index
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.executescript(SCHEMA)
+            connection.execute(
+                "INSERT INTO video VALUES (?, ?, ?, ?, ?)",
+                (video_path, output_video_path, self.frame_rate, self.frames, time.time()),
+            )
+            for name, identity in self.identities.items():
+                intervals = identity["intervals"]
+                connection.execute(
+                    "INSERT INTO identity VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        name,
+                        intervals[0][0],
+                        intervals[-1][1],
+                        sum(end - start + 1 / self.frame_rate for start, end in intervals),
+                        identity["best_frame"],
+                        identity["best_time"],
+                        identity["best_confidence"],
+                        ",".join(str(value) for value in identity["best_box"]),
+                        identity["thumbnail"],
+                    ),
+                )
+                connection.executemany("INSERT INTO interval VALUES (?, ?, ?)", [(name, start, end) for start, end in intervals])
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+
+
+def iter_appearance_files(paths):
+    # Index files, directories (searched recursively) or glob patterns
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "**", "*" + APPEARANCES_SUFFIX), recursive=True))
+        elif os.path.isfile(path):
+            yield path
+        else:
+            yield from sorted(glob.glob(path, recursive=True))
+
+
+def find_appearances(name, paths):
+    # Every interval in which name appears, over all index files under paths
+    results = []
+    for index_path in iter_appearance_files(paths):
+        connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+        try:
+            video_path, output_video_path = connection.execute("SELECT path, output FROM video").fetchone()
+            identity = connection.execute(
+                "SELECT first_seen, last_seen, best_frame, best_confidence FROM identity WHERE name = ?", (name,)
+            ).fetchone()
+            if identity is None:
+                continue
+            intervals = connection.execute("SELECT start, end FROM interval WHERE name = ? ORDER BY start", (name,)).fetchall()
+        finally:
+            connection.close()
+        results.append({
+            "index": index_path,
+            "video": video_path,
+            "output": output_video_path,
+            "name": name,
+            "first_seen": identity[0],
+            "last_seen": identity[1],
+            "best_frame": identity[2],
+            "best_confidence": identity[3],
+            "intervals": [list(interval) for interval in intervals],
+        })
+    return results
+
+
+def load_thumbnail(index_path, name):
+    # JPEG bytes of the best-confidence face of name, or None
+    connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        row = connection.execute("SELECT thumbnail FROM identity WHERE name = ?", (name,)).fetchone()
+    finally:
+        connection.close()
+    return row[0] if row else None
@@ -0,0 +1,171 @@
+import os
+import sys
+import csv
+import glob
+import json
+import multiprocessing
+import cv2
+import face_recognition
+from engine import draw_faces, get_recognizer
+from gallery import DEFAULT_GALLERY_DIR
+from gallery_index import DEFAULT_INDEX
+from matching import DEFAULT_TOLERANCE, UNKNOWN_NAME
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+CSV_FIELDS = ["path", "faces", "boxes", "names", "distances", "error"]
+
+
+def _scan_targets(targets):
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, files in os.walk(target):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, file_name)
+        elif os.path.isfile(target):
+            yield target
+        else:
+            for path in sorted(glob.glob(target, recursive=True)):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    yield path
+
+
+def iter_image_paths(targets):
+    # Targets can be image files, directories (scanned recursively) or glob patterns.
+    # Yields (path, name) where the name is used for annotated copies: the path
+    # relative to the folder all images share, so IMG_0001.JPG from two folders
+    # of an archive do not overwrite each other. Images listed twice are yielded once.
+    paths = list(dict.fromkeys(os.path.normpath(path) for path in _scan_targets(targets)))
+    try:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else None
+    except ValueError:
+        root = None  # on different drives
+    used = set()
+    for path in paths:
+        name = os.path.relpath(os.path.abspath(path), root) if root else os.path.basename(path)
+        # Still possible on case-insensitive file systems and across drives
+        base, extension = os.path.splitext(name)
+        number = 1
+        while os.path.normcase(name) in used:
+            number += 1
+            name = f"{base}_{number}{extension}"
+        used.add(os.path.normcase(name))
+        yield path, name
+
+
+# Batch workers, each process keeps its own copy of the recognizer
+_worker_state = {}
+
+
+def _init_batch_worker(recognizer, output_dir):
+    _worker_state["recognizer"] = recognizer
+    _worker_state["output_dir"] = output_dir
+
+
+def _recognize_image_file(task):
+    path, name = task
+    record = {"path": path, "faces": 0, "boxes": [], "names": [], "distances": [], "error": None}
+    try:
+        image = face_recognition.load_image_file(path)
+        face_locations, matches = _worker_state["recognizer"].process_frame(image)
+    except Exception as ex:
+        # One unreadable file must not stop a scan over a whole archive
+        record["error"] = str(ex)
+        return record
+
+    record["faces"] = len(face_locations)
+    record["boxes"] = [list(face_location) for face_location in face_locations]
+    record["names"] = [match.name for match in matches]
+    record["distances"] = [round(match.distance, 4) for match in matches]
+
+    output_dir = _worker_state["output_dir"]
+    if output_dir and face_locations:
+        output_path = os.path.join(output_dir, name)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        draw_faces(image, face_locations, record["names"])
+        cv2.imwrite(output_path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+    return record
+
+
+class ResultWriter:
+    def __init__(self, results_path, result_format=None):
+        if result_format is None:
+            result_format = "csv" if results_path.lower().endswith(".csv") else "jsonl"
+        if result_format not in ("jsonl", "csv"):
+            raise ValueError(f"Unknown result format: {result_format}")
+
+        results_dir = os.path.dirname(results_path)
+        if results_dir and not os.path.exists(results_dir):
+            os.makedirs(results_dir)
+
+        self.result_format = result_format
+        self.file = open(results_path, "w", encoding="utf-8", newline="")
+        if result_format == "csv":
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record):
+        if self.result_format == "jsonl":
+            self.file.write(json.dumps(record) + "\n")
+        else:
+            row = dict(record)
+            for field in ("boxes", "names", "distances"):
+                row[field] = json.dumps(row[field])
+            row["error"] = row["error"] or ""
+            self.csv_writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+def run_face_recognition_batch(targets, known_image_paths, results_path, output_dir=None, workers=None, update_progress=None, result_format=None, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, recognizer=None, **index_params):
+    if isinstance(targets, str):
+        targets = [targets]
+    tasks = list(iter_image_paths(targets))
+    if not tasks:
+        raise ValueError("No target images found.")
+    if not workers:
+        workers = os.cpu_count() or 1  # None or 0 means all cores
+    elif workers < 0:
+        raise ValueError(f"workers must be at least 0, got {workers}.")
+
+    # The gallery is encoded (or loaded from the store) once for the whole batch
+    if recognizer is None:
+        recognizer = get_recognizer(gallery_dir, tolerance, index_kind, known_image_paths, **index_params)
+    else:
+        recognizer.load(known_image_paths)
+
+    summary = {"images": 0, "faces": 0, "errors": 0, "found_names": set()}
+
+    writer = ResultWriter(results_path, result_format)
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_batch_worker, initargs=(recognizer, output_dir)) as pool:
+            # Results are streamed out as soon as any worker finishes an image
+            chunksize = max(1, min(32, len(tasks) // (workers * 4)))
+            for record in pool.imap_unordered(_recognize_image_file, tasks, chunksize=chunksize):
+                writer.write(record)
+                summary["images"] += 1
+                summary["faces"] += record["faces"]
+                summary["errors"] += record["error"] is not None
+                summary["found_names"].update(name for name in record["names"] if name != UNKNOWN_NAME)
+
+                if callable(update_progress):
+                    update_progress(summary["images"] / len(tasks))
+    finally:
+        writer.close()
+
+    return summary
+
+
+def main(argv=None):
+    # The batch command lives in cli.py, this keeps "python batch.py ..." working
+    from cli import main as cli_main
+
+    if argv is None:
+        argv = sys.argv[1:]
+    return cli_main(["batch"] + list(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
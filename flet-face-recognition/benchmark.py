@@ -0,0 +1,554 @@
+import os
+import sys
+import json
+import time
+import glob
+import platform
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from motion import DEFAULT_MOTION_THRESHOLD  # numpy/OpenCV only, safe to import up front
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Deterministic benchmarks for the recognition paths. Every input is generated
+# offline from a seed: stitched face images, videos with moving faces and random
+# 128-d galleries. Each case runs in a fresh process so peak RSS is per case.
+
+DEFAULT_FIXTURES_DIR = "bench_fixtures"
+DEFAULT_GALLERY_SIZES = (10, 100, 1000, 10000, 100000)
+ENCODING_SIZE = 128
+
+
+# Fixtures
+
+def _identity_style(identity):
+    rng = np.random.RandomState(1000 + identity)
+    return {
+        "skin": tuple(int(c) for c in rng.randint(90, 230, 3)),
+        "eye_spacing": rng.uniform(0.28, 0.4),
+        "eye_size": rng.uniform(0.06, 0.1),
+        "mouth_width": rng.uniform(0.2, 0.35),
+        "hair": tuple(int(c) for c in rng.randint(0, 90, 3)),
+    }
+
+
+def draw_synthetic_face(canvas, center, size, identity):
+    # A simple drawn face, the same identity always looks the same
+    style = _identity_style(identity)
+    cx, cy = center
+    half_w, half_h = int(size * 0.4), int(size * 0.5)
+    cv2.ellipse(canvas, (cx, cy - int(size * 0.1)), (half_w + 4, half_h), 0, 180, 360, style["hair"], -1)
+    cv2.ellipse(canvas, (cx, cy), (half_w, half_h), 0, 0, 360, style["skin"], -1)
+    eye_dx = int(size * style["eye_spacing"] / 2)
+    eye_y = cy - int(size * 0.1)
+    eye_r = max(2, int(size * style["eye_size"]))
+    for side in (-1, 1):
+        cv2.circle(canvas, (cx + side * eye_dx, eye_y), eye_r, (255, 255, 255), -1)
+        cv2.circle(canvas, (cx + side * eye_dx, eye_y), max(1, eye_r // 2), (40, 30, 20), -1)
+        cv2.line(canvas, (cx + side * eye_dx - eye_r, eye_y - 2 * eye_r), (cx + side * eye_dx + eye_r, eye_y - 2 * eye_r), style["hair"], 2)
+    cv2.line(canvas, (cx, eye_y + eye_r), (cx - eye_r, cy + int(size * 0.12)), (60, 60, 90), 2)
+    cv2.ellipse(canvas, (cx, cy + int(size * 0.25)), (int(size * style["mouth_width"] / 2), max(2, int(size * 0.05))), 0, 0, 180, (50, 40, 150), -1)
+
+
+def load_face_crops(faces_dir):
+    # Optional real face photos (one per identity) that are stitched instead of drawn faces
+    crops = []
+    for path in sorted(glob.glob(os.path.join(faces_dir, "*"))):
+        image = cv2.imread(path)
+        if image is not None:
+            crops.append(image)
+    return crops
+
+
+def place_face(canvas, center, size, identity, face_crops=None):
+    if face_crops:
+        crop = cv2.resize(face_crops[identity % len(face_crops)], (size, size))
+        x, y = center[0] - size // 2, center[1] - size // 2
+        height, width = canvas.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(width, x + size), min(height, y + size)
+        if x1 > x0 and y1 > y0:
+            canvas[y0:y1, x0:x1] = crop[y0 - y:y1 - y, x0 - x:x1 - x]
+    else:
+        draw_synthetic_face(canvas, center, size, identity)
+
+
+def _background(width, height, rng):
+    # A smooth gradient with a little noise, so video compression has some work to do
+    gradient = np.linspace(40, 160, width, dtype=np.float32)[None, :, None]
+    background = np.repeat(np.repeat(gradient, height, axis=0), 3, axis=2)
+    background += rng.normal(0, 6, background.shape)
+    return np.clip(background, 0, 255).astype(np.uint8)
+
+
+def make_known_images(fixtures_dir, identities, face_crops=None, size=300):
+    paths = []
+    for identity in range(identities):
+        # One photo per person, the _1 suffix keeps person10 and person1 apart
+        path = os.path.join(fixtures_dir, "known", f"person{identity}_1.png")
+        if not os.path.exists(path):
+            canvas = np.full((size, size, 3), 200, dtype=np.uint8)
+            place_face(canvas, (size // 2, size // 2), int(size * 0.6), identity, face_crops)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cv2.imwrite(path, canvas)
+        paths.append(path)
+    return paths
+
+
+def make_image(path, width, height, faces, identities, seed, face_crops=None):
+    if os.path.exists(path):
+        return path
+    rng = np.random.RandomState(seed)
+    canvas = _background(width, height, rng)
+    # Faces on a grid so they never overlap
+    columns = int(np.ceil(np.sqrt(faces)))
+    rows = int(np.ceil(faces / columns))
+    cell_w, cell_h = width // columns, height // rows
+    size = int(min(cell_w, cell_h) * 0.7)
+    for i in range(faces):
+        center = ((i % columns) * cell_w + cell_w // 2, (i // columns) * cell_h + cell_h // 2)
+        place_face(canvas, center, size, i % identities, face_crops)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    cv2.imwrite(path, canvas)
+    return path
+
+
+def make_video(path, frames, width, height, faces, identities, seed, fps=25, face_crops=None):
+    if os.path.exists(path):
+        return path
+    rng = np.random.RandomState(seed)
+    background = _background(width, height, rng)
+    size = int(min(width, height) * 0.3)
+    # Each face moves along a line and bounces off the frame edges
+    positions = rng.uniform([size, size], [width - size, height - size], (faces, 2))
+    velocities = rng.uniform(-4, 4, (faces, 2))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    output = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(frames):
+        frame = background.copy()
+        for i in range(faces):
+            place_face(frame, (int(positions[i][0]), int(positions[i][1])), size, i % identities, face_crops)
+        positions += velocities
+        for axis, limit in ((0, width), (1, height)):
+            out_of_range = (positions[:, axis] < size // 2) | (positions[:, axis] > limit - size // 2)
+            velocities[out_of_range, axis] *= -1
+        output.write(frame)
+    output.release()
+    return path
+
+
+def make_gallery(size, seed):
+    # Random encodings with the typical scale of dlib face encodings
+    rng = np.random.RandomState(seed)
+    gallery = rng.normal(0, 0.09, (size, ENCODING_SIZE))
+    return gallery, [f"person{i}" for i in range(size)]
+
+
+# Measurement helpers
+
+def _windows_peak_rss():
+    # Peak working set of this process, child processes are not included
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+            )
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss_mb():
+    if resource is None:
+        try:
+            peak = _windows_peak_rss()
+        except (AttributeError, OSError):
+            peak = None
+        return round(peak / (1024 * 1024), 1) if peak else None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(peak, children) / scale, 1)
+
+
+def latency_summary(seconds):
+    values = np.array(seconds) * 1000
+    return {f"p{p}_ms": round(float(v), 3) for p, v in zip((50, 95, 99), np.percentile(values, (50, 95, 99)))}
+
+
+def _stats_fields(stats):
+    snapshot = stats.snapshot()
+    return {
+        "counters": snapshot["counters"],
+        "stages": {
+            stage: {key: round(value, 3) for key, value in stage_stats.items()}
+            for stage, stage_stats in snapshot["stages"].items()
+        },
+    }
+
+
+# Benchmark cases, each one runs in its own process
+
+def check_known_faces(known_paths):
+    # Known images in which detection finds no face, checked before any case
+    # runs so the detection cases do not all fail on an empty gallery
+    import face_recognition
+
+    missing = [path for path in known_paths if not face_recognition.face_locations(face_recognition.load_image_file(path))]
+    return {"missing": missing}
+
+
+def bench_matcher(gallery_size, index_kind, probes_per_frame, frames, seed, n_probe):
+    from gallery_index import make_index
+    from matching import FaceMatcher
+
+    gallery, names = make_gallery(gallery_size, seed)
+    rng = np.random.RandomState(seed + 1)
+    # Probes are noisy copies of gallery rows so recall can be measured
+    truth = rng.randint(0, gallery_size, (frames, probes_per_frame))
+    probes = gallery[truth] + rng.normal(0, 0.02, (frames, probes_per_frame, ENCODING_SIZE))
+
+    params = {"n_probe": n_probe} if index_kind == "ivf" else {}
+    start = time.perf_counter()
+    index = make_index(index_kind, **params).build(gallery)
+    build_seconds = time.perf_counter() - start
+    matcher = FaceMatcher(gallery, names, tolerance=10.0, index=index)
+
+    latencies = []
+    correct = 0
+    start = time.perf_counter()
+    for frame in range(frames):
+        frame_start = time.perf_counter()
+        matches = matcher.match(probes[frame])
+        latencies.append(time.perf_counter() - frame_start)
+        correct += sum(match.name == names[i] for match, i in zip(matches, truth[frame]))
+    seconds = time.perf_counter() - start
+
+    return {
+        "build_seconds": round(build_seconds, 4),
+        "seconds": round(seconds, 4),
+        "frames_per_second": round(frames / seconds, 2),
+        "probes_per_second": round(frames * probes_per_frame / seconds, 2),
+        "recall": round(correct / (frames * probes_per_frame), 4),
+        "latency": latency_summary(latencies),
+    }
+
+
+def bench_image(image_path, known_paths, repeat, gallery_dir):
+    from face_rec import run_face_recognition_image
+    from metrics import RecognitionStats
+
+    stats = RecognitionStats()
+    # The first call fills the gallery store, it is reported separately
+    start = time.perf_counter()
+    run_face_recognition_image(image_path, known_paths, None, gallery_dir=gallery_dir)
+    cold_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        locations, _ = run_face_recognition_image(image_path, known_paths, None, gallery_dir=gallery_dir, stats=stats)
+        latencies.append(time.perf_counter() - start)
+
+    result = {
+        "cold_seconds": round(cold_seconds, 4),
+        "seconds": round(sum(latencies), 4),
+        "images_per_second": round(repeat / sum(latencies), 3),
+        "faces_found": len(locations),
+        "latency": latency_summary(latencies),
+    }
+    result.update(_stats_fields(stats))
+    return result
+
+
+def bench_video(video_path, known_paths, output_path, gallery_dir, workers=1, batch_size=1, detect_model=None, motion_threshold=None):
+    from engine import DetectionOptions
+    from face_rec import run_face_recognition_video
+    from live_gallery import LiveRecognizer
+    from metrics import RecognitionStats
+    from motion import MotionOptions
+
+    # No known images runs on an empty gallery, every face is Unknown
+    recognizer = None if known_paths else LiveRecognizer(gallery_dir)
+    stats = RecognitionStats()
+    start = time.perf_counter()
+    found_names = run_face_recognition_video(
+        video_path, known_paths, output_path, None, None, gallery_dir=gallery_dir, workers=workers, stats=stats,
+        detection=DetectionOptions(batch_size=batch_size, detect_model=detect_model),
+        motion=MotionOptions(motion_threshold) if motion_threshold is not None else None,
+        recognizer=recognizer,
+    )
+    seconds = time.perf_counter() - start
+
+    frames = stats.snapshot()["counters"]["frames_in"]
+    result = {
+        "seconds": round(seconds, 4),
+        "frames_per_second": round(frames / seconds, 2) if seconds else 0.0,
+        "found_names": sorted(found_names),
+    }
+    result.update(_stats_fields(stats))
+    return result
+
+
+def bench_webcam(video_path, known_paths, gallery_dir, buffer_pool=False):
+    from face_rec import run_face_recognition_webcam
+    from metrics import RecognitionStats
+    from transport import FrameTransport
+
+    # The webcam mode reads a video file as its capture device
+    stats = RecognitionStats()
+    transport = FrameTransport(lambda img_base64: None, buffer_pool=buffer_pool)
+    start = time.perf_counter()
+    run_face_recognition_webcam(
+        known_paths, None, threading.Event(), gallery_dir=gallery_dir, source=video_path, transport=transport, stats=stats, buffer_pool=buffer_pool
+    )
+    seconds = time.perf_counter() - start
+
+    counters = stats.snapshot()["counters"]
+    result = {
+        "seconds": round(seconds, 4),
+        "capture_fps": round(counters["frames_in"] / seconds, 2) if seconds else 0.0,
+        "processed_fps": round(counters["frames_processed"] / seconds, 2) if seconds else 0.0,
+        # Frame sized buffers allocated by the pipeline (capture, copies, scaling, JPEG/base64) per captured frame
+        "allocations_per_frame": round(counters.get("frame_allocations", 0) / counters["frames_in"], 2) if counters["frames_in"] else 0.0,
+        "transport": transport.stats(),
+    }
+    result.update(_stats_fields(stats))
+    return result
+
+
+def _run_case(function, kwargs):
+    result = function(**kwargs)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(function, **kwargs):
+    # A fresh process per case keeps peak RSS and warm caches from leaking between cases
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run_case, function, kwargs).result()
+
+
+def _parse_list(value, cast=int):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def _parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def compare_results(previous_path, results):
+    # Prints the throughput change of every case that exists in both runs
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {json.dumps(case["case"], sort_keys=True): case for case in json.load(f)["results"]}
+    for case in results:
+        old = previous.get(json.dumps(case["case"], sort_keys=True))
+        if not old:
+            continue
+        for key in ("frames_per_second", "images_per_second", "probes_per_second", "processed_fps"):
+            if key in case and old.get(key):
+                change = (case[key] / old[key] - 1) * 100
+                print(f"{json.dumps(case['case'])}: {key} {old[key]} -> {case[key]} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition paths on synthetic inputs.")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--modes", default="matcher,image,video,webcam,static", help="comma separated: matcher,image,video,webcam,static")
+    parser.add_argument("--fixtures-dir", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--faces-dir", help="real face photos to stitch instead of drawn faces")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gallery-sizes", type=_parse_list, default=list(DEFAULT_GALLERY_SIZES))
+    parser.add_argument("--indexes", default="brute,ivf")
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--probes-per-frame", type=int, default=4)
+    parser.add_argument("--matcher-frames", type=int, default=200)
+    parser.add_argument("--identities", type=int, default=5)
+    parser.add_argument("--faces", type=int, default=3, help="faces per image/video frame")
+    parser.add_argument("--image-size", type=_parse_size, default=(1280, 720))
+    parser.add_argument("--image-repeat", type=int, default=5)
+    parser.add_argument("--video-frames", type=int, default=120)
+    parser.add_argument("--video-size", type=_parse_size, default=(640, 480))
+    parser.add_argument("--workers", type=_parse_list, default=[1], help="comma separated worker counts for video")
+    parser.add_argument("--batch-sizes", type=_parse_list, default=[1], help="comma separated detection batch sizes for video")
+    parser.add_argument("--detect-model", choices=("hog", "cnn"), default="hog")
+    parser.add_argument("--motion-threshold", type=float, default=DEFAULT_MOTION_THRESHOLD, help="motion gate sensitivity for the static video case")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    modes = set(args.modes.split(","))
+    detection_modes = modes & {"image", "video", "webcam"}
+    face_crops = load_face_crops(args.faces_dir) if args.faces_dir else None
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    gallery_dir = os.path.join(args.fixtures_dir, "gallery_store")
+
+    known_paths = make_known_images(args.fixtures_dir, args.identities, face_crops)
+    width, height = args.image_size
+    image_path = make_image(
+        os.path.join(args.fixtures_dir, f"image_{width}x{height}_{args.faces}f_s{args.seed}.png"),
+        width, height, args.faces, args.identities, args.seed, face_crops,
+    )
+    width, height = args.video_size
+    video_path = make_video(
+        os.path.join(args.fixtures_dir, f"video_{width}x{height}_{args.video_frames}x{args.faces}f_s{args.seed}.mp4"),
+        args.video_frames, width, height, args.faces, args.identities, args.seed, face_crops=face_crops,
+    )
+
+    results = []
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "args": {key: value for key, value in vars(args).items()},
+        },
+        "results": results,
+    }
+
+    def record(case, function, **kwargs):
+        # A failing case is recorded with its error and the run goes on. The
+        # report is rewritten after every case, so an interrupted run keeps
+        # the cases that finished.
+        print(f"running {json.dumps(case)}", file=sys.stderr)
+        result = {"case": case}
+        try:
+            result.update(run_isolated(function, **kwargs))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"failed {json.dumps(case)}: {result['error']}", file=sys.stderr)
+        results.append(result)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    def skip(case, reason):
+        print(f"skipped {json.dumps(case)}: {reason}", file=sys.stderr)
+        results.append({"case": case, "skipped": reason})
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    # The image, video and webcam cases only mean something when the known
+    # images have a detectable face, otherwise they are recorded as skipped
+    skip_reason = None
+    if detection_modes:
+        try:
+            missing = run_isolated(check_known_faces, known_paths=known_paths)["missing"]
+        except Exception as e:
+            missing = []
+            skip_reason = f"checking the known images failed: {type(e).__name__}: {e}"
+        if missing:
+            skip_reason = (
+                f"no face detected in {', '.join(missing)}, "
+                + ("pass --faces-dir with real face photos" if not face_crops else "use other photos in --faces-dir")
+            )
+
+    if "matcher" in modes:
+        for gallery_size in args.gallery_sizes:
+            for index_kind in args.indexes.split(","):
+                record(
+                    {"mode": "matcher", "gallery_size": gallery_size, "index": index_kind},
+                    bench_matcher,
+                    gallery_size=gallery_size,
+                    index_kind=index_kind,
+                    probes_per_frame=args.probes_per_frame,
+                    frames=args.matcher_frames,
+                    seed=args.seed,
+                    n_probe=args.n_probe,
+                )
+    if "image" in modes:
+        case = {"mode": "image", "size": list(args.image_size), "faces": args.faces}
+        if skip_reason:
+            skip(case, skip_reason)
+        else:
+            record(
+                case,
+                bench_image,
+                image_path=image_path,
+                known_paths=known_paths,
+                repeat=args.image_repeat,
+                gallery_dir=gallery_dir,
+            )
+    if "video" in modes:
+        for workers in args.workers:
+            for batch_size in args.batch_sizes:
+                case = {
+                    "mode": "video", "size": list(args.video_size), "frames": args.video_frames, "faces": args.faces,
+                    "workers": workers, "batch_size": batch_size, "model": args.detect_model,
+                }
+                if skip_reason:
+                    skip(case, skip_reason)
+                    continue
+                record(
+                    case,
+                    bench_video,
+                    video_path=video_path,
+                    known_paths=known_paths,
+                    output_path=os.path.join(args.fixtures_dir, "bench_output.mp4"),
+                    gallery_dir=gallery_dir,
+                    workers=workers,
+                    batch_size=batch_size,
+                    detect_model=args.detect_model,
+                )
+    if "static" in modes:
+        # An empty scene, where the motion gate lets almost every frame skip
+        # detection. It runs on an empty gallery, so it needs no detectable known faces.
+        static_path = make_video(
+            os.path.join(args.fixtures_dir, f"static_{width}x{height}_{args.video_frames}_s{args.seed}.mp4"),
+            args.video_frames, width, height, 0, args.identities, args.seed,
+        )
+        for motion_threshold in (None, args.motion_threshold):
+            record(
+                {"mode": "static", "size": list(args.video_size), "frames": args.video_frames, "motion_threshold": motion_threshold},
+                bench_video,
+                video_path=static_path,
+                known_paths=[],
+                output_path=os.path.join(args.fixtures_dir, "bench_static_output.mp4"),
+                gallery_dir=gallery_dir,
+                motion_threshold=motion_threshold,
+            )
+    if "webcam" in modes:
+        for buffer_pool in (False, True):
+            case = {"mode": "webcam", "size": list(args.video_size), "frames": args.video_frames, "faces": args.faces, "buffer_pool": buffer_pool}
+            if skip_reason:
+                skip(case, skip_reason)
+                continue
+            record(
+                case,
+                bench_webcam,
+                video_path=video_path,
+                known_paths=known_paths,
+                gallery_dir=gallery_dir,
+                buffer_pool=buffer_pool,
+            )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import os
+import sys
+import glob
+import json
+import time
+import signal
+import argparse
+import threading
+# Only the recognition core is imported, never the Flet UI, so the CLI starts
+# fast and runs on servers without a display
+from appearances import default_appearances_path, find_appearances
+from batch import iter_image_paths, run_face_recognition_batch
+from engine import DETECTION_MODELS, DetectionOptions
+from face_rec import face_records, run_face_recognition_image, run_face_recognition_multi_webcam, run_face_recognition_video, run_face_recognition_webcam
+from gallery import DEFAULT_GALLERY_DIR, DEFAULT_MAX_IMAGE_SIZE, GalleryStore, NoKnownFacesError
+from gallery_index import DEFAULT_INDEX, INDEX_TYPES
+from matching import DEFAULT_TOLERANCE
+from motion import DEFAULT_MOTION_CHECK_EVERY, DEFAULT_MOTION_THRESHOLD, MotionOptions
+from templates import DEFAULT_MAX_MEDOIDS
+from tracking import DEFAULT_REFRESH_EVERY
+from utils import IDENTITY_GROUPINGS
+from video_jobs import DEFAULT_CHECKPOINT_EVERY, JobOptions, merge_appearance_indexes, split_frame_range
+from video_output import DEFAULT_CLIP_GAP, OUTPUT_MODES, OutputOptions, concatenate_videos
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # argparse exits with 2 on bad arguments
+EXIT_NO_KNOWN_FACES = 3
+
+
+class UsageError(Exception):
+    pass
+
+
+def expand_image_paths(paths):
+    # A typo in a path would otherwise look like an empty glob
+    for path in paths:
+        if not os.path.exists(path) and not glob.glob(path, recursive=True):
+            raise UsageError(f"No such file, directory or glob match: {path}")
+    return [path for path, _ in iter_image_paths(paths)]
+
+
+def emit(record):
+    print(json.dumps(record), flush=True)
+
+
+def matcher_options(args):
+    return {
+        "gallery_dir": args.gallery_dir,
+        "tolerance": args.tolerance,
+        "index_kind": args.index,
+        "grouping": args.grouping,
+        "max_medoids": None if args.no_templates else args.medoids,
+    }
+
+
+def motion_options(args):
+    if args.motion_threshold is None:
+        return {"motion": None}
+    return {"motion": MotionOptions(args.motion_threshold, args.motion_check_every)}
+
+
+def command_image(args):
+    face_locations, matches = run_face_recognition_image(
+        args.target,
+        expand_image_paths(args.known),
+        args.output,
+        **matcher_options(args),
+    )
+    emit({"target": args.target, "output": args.output, "faces": face_records(face_locations, matches)})
+    return EXIT_OK
+
+
+def command_video(args):
+    start = time.monotonic()
+    output = None if args.output_mode == "none" else args.output
+    found_names = run_face_recognition_video(
+        args.video,
+        expand_image_paths(args.known),
+        output,
+        None,
+        None,
+        workers=args.workers,
+        detection=DetectionOptions(
+            detect_every=args.detect_every,
+            detect_scale=args.detect_scale,
+            track_refresh_every=args.track_refresh_every,
+            batch_size=args.batch_size,
+            detect_model=args.model,
+            upsample=args.upsample,
+        ),
+        output=OutputOptions(
+            output_mode=args.output_mode,
+            clip_gap=args.clip_gap,
+            appearances_path=True if args.appearances == "" else args.appearances,  # "" is the default path
+        ),
+        job=JobOptions(
+            start_frame=args.start_frame,
+            end_frame=args.end_frame,
+            start_time=args.start_time,
+            end_time=args.end_time,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+        ),
+        **motion_options(args),
+        **matcher_options(args),
+    )
+    emit({
+        "video": args.video,
+        "output": output,
+        "found_names": sorted(found_names),
+        "seconds": round(time.monotonic() - start, 3),
+    })
+    return EXIT_OK
+
+
+def stop_event_for(duration):
+    # Set on Ctrl+C, SIGTERM or after duration seconds
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    if duration:
+        timer = threading.Timer(duration, stop_event.set)
+        timer.daemon = True
+        timer.start()
+    return stop_event
+
+
+def parse_source(source):
+    return int(source) if source.isdigit() else source
+
+
+def command_webcam(args):
+    stop_event = stop_event_for(args.duration)
+
+    def update_faces(face_locations, matches):
+        # One JSON line per processed frame
+        emit({"time": round(time.time(), 3), "faces": face_records(face_locations, matches)})
+
+    run_face_recognition_webcam(
+        expand_image_paths(args.known),
+        None,
+        stop_event,
+        source=parse_source(args.source),
+        update_faces=update_faces,
+        track_refresh_every=args.track_refresh_every,
+        buffer_pool=args.buffer_pool,
+        **motion_options(args),
+        **matcher_options(args),
+    )
+    return EXIT_OK
+
+
+def command_multicam(args):
+    stop_event = stop_event_for(args.duration)
+
+    def update_faces(index, face_locations, matches):
+        emit({"time": round(time.time(), 3), "source": index, "faces": face_records(face_locations, matches)})
+
+    def update_stats(summary):
+        emit({"time": round(time.time(), 3), "stats": summary})
+
+    run_face_recognition_multi_webcam(
+        [parse_source(source) for source in args.sources],
+        expand_image_paths(args.known),
+        None,
+        stop_event,
+        inference_workers=args.workers,
+        update_faces=update_faces,
+        update_stats=update_stats,
+        stats_interval=args.stats_interval,
+        track_refresh_every=args.track_refresh_every,
+        buffer_pool=args.buffer_pool,
+        **motion_options(args),
+        **matcher_options(args),
+    )
+    return EXIT_OK
+
+
+def command_batch(args):
+    summary = run_face_recognition_batch(
+        args.targets,
+        expand_image_paths(args.known),
+        args.results,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        **matcher_options(args),
+    )
+    summary["found_names"] = sorted(summary["found_names"])
+    summary["results"] = args.results
+    emit(summary)
+    return EXIT_OK
+
+
+def command_enroll(args):
+    image_paths = expand_image_paths(args.images)
+    store = GalleryStore(args.gallery_dir)
+
+    def update_progress(fraction):
+        print(f"enrolled {fraction:.0%}", file=sys.stderr, flush=True)
+
+    rows = store.enroll(image_paths, args.workers, args.max_size, update_progress if args.progress else None)
+    _, names = store.sync(image_paths, args.grouping, max_size=args.max_size)
+    emit({
+        "gallery_dir": args.gallery_dir,
+        "enrolled": [path for path, row in zip(image_paths, rows) if row >= 0],
+        "no_face": [path for path, row in zip(image_paths, rows) if row < 0],
+        "identities": sorted(set(names)),
+        "rejected": store.rejected,
+    })
+    return EXIT_OK
+
+
+def command_split(args):
+    emit({"video": args.video, "segments": [list(segment) for segment in split_frame_range(args.video, args.segments)]})
+    return EXIT_OK
+
+
+def command_merge(args):
+    if args.outputs and not args.output:
+        raise ValueError("--output is needed to merge videos")
+    if args.outputs:
+        concatenate_videos(args.outputs, args.output)
+    appearances_output = None
+    if args.appearances:
+        appearances_output = args.appearances_output or default_appearances_path(args.output or args.appearances[0])
+        merge_appearance_indexes(args.appearances, appearances_output, args.video, args.output)
+    emit({"output": args.output if args.outputs else None, "appearances": appearances_output})
+    return EXIT_OK
+
+
+def command_search(args):
+    emit({"name": args.name, "appearances": find_appearances(args.name, args.indexes)})
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless face recognition, results are printed as JSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--gallery-dir", default=DEFAULT_GALLERY_DIR)
+    common.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    common.add_argument("--index", choices=sorted(INDEX_TYPES), default=DEFAULT_INDEX)
+    common.add_argument("--grouping", choices=IDENTITY_GROUPINGS, default="prefix", help="how images are grouped into identities")
+    common.add_argument("--medoids", type=int, default=DEFAULT_MAX_MEDOIDS, help="medoids kept per identity next to the centroid")
+    common.add_argument("--no-templates", action="store_true", help="match against every image instead of per-identity templates")
+    common.add_argument("-k", "--known", nargs="+", required=True, help="known face images or directories")
+
+    motion = argparse.ArgumentParser(add_help=False)
+    motion.add_argument("--motion-threshold", type=float, help=f"detect only on motion: fraction of changed pixels, e.g. {DEFAULT_MOTION_THRESHOLD}")
+    motion.add_argument("--motion-check-every", type=int, default=DEFAULT_MOTION_CHECK_EVERY, help="frames without motion after which one is checked anyway")
+
+    image = subparsers.add_parser("image", parents=[common], help="recognize faces in an image")
+    image.add_argument("target")
+    image.add_argument("-o", "--output", help="write the annotated image here")
+    image.set_defaults(handler=command_image)
+
+    video = subparsers.add_parser("video", parents=[common, motion], help="recognize faces in a video file")
+    video.add_argument("video")
+    video.add_argument("-o", "--output", default="processed_video.mp4")
+    video.add_argument("-w", "--workers", type=int, default=1, help="worker processes, 0 for all cores")
+    video.add_argument("--detect-every", type=int, default=1)
+    video.add_argument("--detect-scale", type=float, default=1.0)
+    video.add_argument("--track-refresh-every", type=int)
+    video.add_argument("--batch-size", type=int, default=1, help="frames per detection/encoding call")
+    video.add_argument("--model", choices=DETECTION_MODELS, default="hog", help="face detector, cnn batches frames on the GPU")
+    video.add_argument("--upsample", type=int, default=1, help="times to upsample frames to find smaller faces")
+    video.add_argument("--output-mode", choices=OUTPUT_MODES, default="all", help="all frames, only frames with faces, one clip per appearance, or no output")
+    video.add_argument("--clip-gap", type=float, default=DEFAULT_CLIP_GAP, help="seconds without faces that end a clip")
+    video.add_argument("--appearances", nargs="?", const="", metavar="PATH", help="save when each identity appears (default: <output>.faces.db)")
+    video.add_argument("--start-frame", type=int, help="first frame index to process (from 0)")
+    video.add_argument("--end-frame", type=int, help="frame index to stop before")
+    video.add_argument("--start-time", type=float, help="start position in seconds")
+    video.add_argument("--end-time", type=float, help="end position in seconds")
+    video.add_argument("--checkpoint", metavar="PATH", help="save progress here and resume from it when run again")
+    video.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY, help="frames between checkpoints")
+    video.set_defaults(handler=command_video)
+
+    split = subparsers.add_parser("split", help="print frame ranges that split a video into segments")
+    split.add_argument("video")
+    split.add_argument("-n", "--segments", type=int, default=4)
+    split.set_defaults(handler=command_split)
+
+    merge = subparsers.add_parser("merge", help="join the outputs of video segments")
+    merge.add_argument("outputs", nargs="*", help="segment output videos, in order")
+    merge.add_argument("-o", "--output", help="merged video")
+    merge.add_argument("--appearances", nargs="+", default=[], metavar="INDEX", help="segment appearance indexes to merge")
+    merge.add_argument("--appearances-output", help="merged appearance index (default: <output>.faces.db)")
+    merge.add_argument("--video", help="source video recorded in the merged index")
+    merge.set_defaults(handler=command_merge)
+
+    webcam = subparsers.add_parser("webcam", parents=[common, motion], help="recognize faces from a camera or stream")
+    webcam.add_argument("--source", default="0", help="device index, file or stream URL")
+    webcam.add_argument("--duration", type=float, help="stop after this many seconds")
+    webcam.add_argument("--track-refresh-every", type=int, default=DEFAULT_REFRESH_EVERY)
+    webcam.add_argument("--buffer-pool", action="store_true", help="reuse preallocated frame buffers instead of allocating per frame")
+    webcam.set_defaults(handler=command_webcam)
+
+    multicam = subparsers.add_parser("multicam", parents=[common, motion], help="recognize faces from several cameras or streams")
+    multicam.add_argument("sources", nargs="+", help="device indexes, files or stream URLs")
+    multicam.add_argument("-w", "--workers", type=int, default=0, help="inference threads shared by all sources, 0 for one per source")
+    multicam.add_argument("--duration", type=float, help="stop after this many seconds")
+    multicam.add_argument("--stats-interval", type=float, default=5.0, help="seconds between per-source stats lines")
+    multicam.add_argument("--track-refresh-every", type=int, default=DEFAULT_REFRESH_EVERY)
+    multicam.add_argument("--buffer-pool", action="store_true", help="reuse preallocated frame buffers instead of allocating per frame")
+    multicam.set_defaults(handler=command_multicam)
+
+    batch = subparsers.add_parser("batch", parents=[common], help="recognize faces in many images")
+    batch.add_argument("targets", nargs="+", help="target images, directories or glob patterns")
+    batch.add_argument("-r", "--results", default="results.jsonl", help="results file, .jsonl or .csv")
+    batch.add_argument("-o", "--output-dir", help="write annotated copies of images with faces here")
+    batch.add_argument("-w", "--workers", type=int, default=0, help="worker processes, 0 for all cores")
+    batch.set_defaults(handler=command_batch)
+
+    enroll = subparsers.add_parser("enroll", help="encode known face images into the gallery store")
+    enroll.add_argument("images", nargs="+", help="known face images or directories")
+    enroll.add_argument("--gallery-dir", default=DEFAULT_GALLERY_DIR)
+    enroll.add_argument("-w", "--workers", type=int, default=0, help="worker processes, 0 for all cores")
+    enroll.add_argument("--max-size", type=int, default=DEFAULT_MAX_IMAGE_SIZE, help="longest image side before detection, 0 keeps full resolution")
+    enroll.add_argument("--progress", action="store_true", help="print progress to stderr")
+    enroll.add_argument("--grouping", choices=IDENTITY_GROUPINGS, default="prefix", help="how images are grouped into identities")
+    enroll.set_defaults(handler=command_enroll)
+
+    search = subparsers.add_parser("search", help="find when a person appears in processed videos")
+    search.add_argument("name")
+    search.add_argument("indexes", nargs="+", help="appearance index files (.faces.db), directories or glob patterns")
+    search.set_defaults(handler=command_search)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "workers", 0) < 0:
+        parser.error("--workers must be 0 or more")
+    if getattr(args, "workers", None) == 0:
+        args.workers = None  # all cores
+
+    try:
+        return args.handler(args)
+    except NoKnownFacesError as ex:
+        emit({"error": str(ex)})
+        return EXIT_NO_KNOWN_FACES
+    except UsageError as ex:
+        emit({"error": str(ex)})
+        return EXIT_USAGE
+    except Exception as ex:
+        emit({"error": str(ex)})
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import os
+import inspect
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+import face_recognition
+from gallery import DEFAULT_GALLERY_DIR, load_known_faces
+from gallery_index import DEFAULT_INDEX, check_index_params, load_or_build_index
+from templates import DEFAULT_MAX_MEDOIDS
+from matching import DEFAULT_TOLERANCE, FaceMatcher
+from tracking import FaceTracker
+from metrics import NULL_STATS
+
+
+def load_matcher(image_paths, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, grouping="prefix", max_medoids=DEFAULT_MAX_MEDOIDS, **index_params):
+    # Load the known face encodings, only new or changed images are encoded
+    known_faces, known_names = load_known_faces(image_paths, gallery_dir, grouping, max_medoids)
+    index = load_or_build_index(known_faces, index_kind, gallery_dir, **index_params)
+    return FaceMatcher(known_faces, known_names, tolerance, index)
+
+
+DETECTION_MODELS = ("hog", "cnn")
+_dlib_batch_encoding = None  # unknown until the first batched encoding
+
+
+def detect_faces(frames, model="hog", upsample=1):
+    # cnn detects a whole batch of same-sized frames in one call (on the GPU when
+    # dlib has CUDA), hog has no batch API and runs frame by frame
+    if model not in DETECTION_MODELS:
+        raise ValueError(f"Unknown detection model: {model}")
+    if model == "cnn" and len(frames) > 1:
+        return face_recognition.batch_face_locations(frames, number_of_times_to_upsample=upsample, batch_size=len(frames))
+    return [face_recognition.face_locations(frame, number_of_times_to_upsample=upsample, model=model) for frame in frames]
+
+
+def _dlib_batch_face_encodings(frames, locations_per_frame):
+    import dlib
+    api = face_recognition.api
+    indices = [i for i, locations in enumerate(locations_per_frame) if locations]
+    shapes = [dlib.full_object_detections(api._raw_face_landmarks(frames[i], locations_per_frame[i], model="small")) for i in indices]
+    descriptors = api.face_encoder.compute_face_descriptor([frames[i] for i in indices], shapes, 1)
+
+    encodings = [[] for _ in frames]
+    for i, frame_descriptors in zip(indices, descriptors):
+        encodings[i] = [np.array(descriptor) for descriptor in frame_descriptors]
+    return encodings
+
+
+def batch_face_encodings(frames, locations_per_frame):
+    # Encodes the faces of several frames with one dlib call when the installed
+    # dlib has the batched compute_face_descriptor, frame by frame otherwise
+    global _dlib_batch_encoding
+    if sum(1 for locations in locations_per_frame if locations) > 1 and _dlib_batch_encoding is not False:
+        try:
+            encodings = _dlib_batch_face_encodings(frames, locations_per_frame)
+            _dlib_batch_encoding = True
+            return encodings
+        except (ImportError, AttributeError, TypeError, RuntimeError):
+            if _dlib_batch_encoding:
+                raise
+            _dlib_batch_encoding = False
+    return [
+        face_recognition.face_encodings(frame, locations) if locations else []
+        for frame, locations in zip(frames, locations_per_frame)
+    ]
+
+
+def recognize_batch(frames, matcher, scale=1.0, tracker=None, stats=NULL_STATS, buffers=None, model="hog", upsample=1):
+    # Recognizes consecutive frames of one stream with one detection call and one
+    # encoding call for the whole batch where the library allows it. Returns
+    # (face_locations, matches) per frame.
+    start = stats.clock()
+    # resize the frames for faster processing, into buffers when they are given
+    if scale != 1.0:
+        frames = [
+            cv2.resize(frame, (0, 0), dst=buffers[i] if buffers else None, fx=scale, fy=scale)
+            for i, frame in enumerate(frames)
+        ]
+
+    locations_per_frame = detect_faces(frames, model, upsample)
+    stats.add_time("detect", start)
+
+    if tracker is None:
+        wanted = [list(range(len(locations))) for locations in locations_per_frame]
+    else:
+        # Only faces on new or stale tracks are encoded, the others keep their
+        # identity. Labels resolve to the track's latest encoding at that frame,
+        # so a batch gives the same results as the frames one by one.
+        wanted = []
+        labels = []  # per face: number of the encoding that names it, or the track's earlier match
+        encoded_tracks = []  # (track, tracker update) for every encoded face
+        latest = {}
+        for locations in locations_per_frame:
+            tracks = tracker.update(locations)
+            stale = [i for i, track in enumerate(tracks) if tracker.needs_encoding(track)]
+            for i in stale:
+                latest[id(tracks[i])] = len(encoded_tracks)
+                encoded_tracks.append((tracks[i], tracker.updates))
+                tracker.assign(tracks[i], tracks[i].match)  # the next refresh counts from now
+            labels.append([latest.get(id(track), track.match) for track in tracks])
+            wanted.append(stale)
+
+    flat_matches = []
+    if any(wanted):
+        start = stats.clock()
+        encodings = batch_face_encodings(frames, [
+            [locations[i] for i in indices] for locations, indices in zip(locations_per_frame, wanted)
+        ])
+        stats.add_time("encode", start)
+
+        # All faces of the batch are matched against the gallery in one go
+        start = stats.clock()
+        flat_matches = matcher.match([encoding for frame_encodings in encodings for encoding in frame_encodings])
+        stats.add_time("match", start)
+
+    if tracker is None:
+        matches = iter(flat_matches)
+        matches_per_frame = [[next(matches) for _ in indices] for indices in wanted]
+    else:
+        for (track, updates), match in zip(encoded_tracks, flat_matches):
+            tracker.assign(track, match, updates)
+        matches_per_frame = [
+            [flat_matches[label] if isinstance(label, int) else label for label in frame_labels]
+            for frame_labels in labels
+        ]
+
+    results = []
+    for face_locations, matches in zip(locations_per_frame, matches_per_frame):
+        stats.count("frames_processed")
+        stats.faces(len(face_locations))
+        if scale != 1.0:
+            # Make bigger face locations since the frame was resized
+            face_locations = [
+                tuple(int(round(value / scale)) for value in face_location)
+                for face_location in face_locations
+            ]
+        results.append((face_locations, matches))
+    return results
+
+
+def recognize_faces(frame, matcher, scale=1.0, tracker=None, stats=NULL_STATS, buffer=None, model="hog", upsample=1):
+    return recognize_batch([frame], matcher, scale, tracker, stats, [buffer] if buffer is not None else None, model, upsample)[0]
+
+
+def draw_faces(frame, face_locations, face_names):
+    for (top, right, bottom, left), name in zip(face_locations, face_names):
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
+        cv2.rectangle(frame, (left, bottom - 25), (right, bottom), (0, 0, 255), cv2.FILLED)
+        font = cv2.FONT_HERSHEY_DUPLEX
+        cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.5, (255, 255, 255), 1)
+
+
+def _gallery_key(image_paths):
+    # Known images are reloaded only when the list or a file's size/mtime changes
+    key = []
+    for path in image_paths:
+        try:
+            stat = os.stat(path)
+            key.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append((os.path.abspath(path), None, None))
+    return tuple(key)
+
+
+class DetectionOptions:
+    # How the frames of a video or stream are recognized: every detect_every-th
+    # frame, resized by detect_scale, batch_size detection frames per detection
+    # and encoding call, with detect_model ("hog" or "cnn") and upsample. None
+    # uses the recognizer's setting. track_refresh_every=None disables tracking.
+
+    def __init__(self, detect_every=1, detect_scale=None, track_refresh_every=None, batch_size=1, detect_model=None, upsample=None):
+        self.detect_every = max(1, int(detect_every))
+        self.detect_scale = detect_scale
+        self.track_refresh_every = track_refresh_every
+        self.batch_size = max(1, int(batch_size))
+        self.detect_model = detect_model
+        self.upsample = upsample
+
+
+class FaceRecognizer:
+    # Long-lived recognition engine: holds the loaded gallery and index, the
+    # detection settings and reusable resize buffers. The webcam, video, image
+    # and batch drivers all recognize through it, and get_recognizer() keeps one
+    # per gallery and setting so warm state survives across calls and UI pages.
+    # load() with other images swaps the matcher of streams already running on
+    # it, which LiveRecognizer relies on. Trackers are per stream and passed in by the caller. The detection
+    # settings can be overridden per call.
+
+    def __init__(self, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, detect_scale=1.0, detect_model="hog", upsample=1, grouping="prefix", max_medoids=DEFAULT_MAX_MEDOIDS, **index_params):
+        check_index_params(index_kind, index_params)
+        self.gallery_dir = gallery_dir
+        self.tolerance = tolerance
+        self.index_kind = index_kind
+        self.grouping = grouping
+        self.max_medoids = max_medoids
+        self.index_params = index_params
+        self.detect_scale = detect_scale
+        self.detect_model = detect_model
+        self.upsample = upsample
+        self.matcher = None
+        self._gallery_key = None
+        self._lock = threading.Lock()
+        self._buffers = threading.local()  # one resize buffer per thread
+
+    def __getstate__(self):
+        # Sent to worker processes without the lock and thread-local buffers
+        state = self.__dict__.copy()
+        del state["_lock"], state["_buffers"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._buffers = threading.local()
+
+    def load(self, image_paths):
+        key = _gallery_key(image_paths)
+        with self._lock:
+            if self.matcher is None or key != self._gallery_key:
+                self.matcher = load_matcher(
+                    image_paths, self.gallery_dir, self.tolerance, self.index_kind, self.grouping, self.max_medoids, **self.index_params
+                )
+                self._gallery_key = key
+        return self
+
+    def new_tracker(self, refresh_every):
+        # track refresh_every=None disables tracking
+        return FaceTracker(refresh_every) if refresh_every else None
+
+    def _resize_buffers(self, frames, scale):
+        # One buffer per batch slot, reused while the frame size stays the same
+        buffers = getattr(self._buffers, "resize", None)
+        if buffers is None:
+            buffers = self._buffers.resize = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            shape = (int(round(height * scale)), int(round(width * scale))) + frame.shape[2:]
+            if i == len(buffers):
+                buffers.append(None)
+            if buffers[i] is None or buffers[i].shape != shape or buffers[i].dtype != frame.dtype:
+                buffers[i] = cv2.resize(frame, (shape[1], shape[0]))
+        return buffers
+
+    def process_frame(self, frame, tracker=None, scale=None, stats=NULL_STATS, model=None, upsample=None):
+        return self.process_batch([frame], tracker, scale, stats, model, upsample)[0]
+
+    def process_batch(self, frames, tracker=None, scale=None, stats=NULL_STATS, model=None, upsample=None):
+        # Consecutive frames of one stream, the tracker carries identities between them
+        if self.matcher is None:
+            raise RuntimeError("No known faces loaded, call load() first.")
+        if scale is None:
+            scale = self.detect_scale
+        buffers = self._resize_buffers(frames, scale) if scale != 1.0 else None
+        return recognize_batch(
+            frames,
+            self.matcher,
+            scale,
+            tracker,
+            stats,
+            buffers,
+            model or self.detect_model,
+            self.upsample if upsample is None else upsample,
+        )
+
+
+def check_recognizer_options(index_kind, options):
+    # The extra keyword arguments of the recognition functions are FaceRecognizer
+    # settings (grouping, max_medoids, ...) or parameters of the index
+    own = inspect.signature(FaceRecognizer.__init__).parameters
+    check_index_params(index_kind, {name: value for name, value in options.items() if name not in own})
+
+
+MAX_CACHED_RECOGNIZERS = 4
+_recognizers = OrderedDict()
+_recognizers_lock = threading.Lock()
+
+
+def get_recognizer(gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, image_paths=None, **index_params):
+    # With image_paths the recognizer comes loaded and is shared only by callers
+    # with the same known images (and file stamps), so loading another gallery
+    # never swaps the matcher under a job that is still running on this one.
+    # The least recently used ones are dropped from the cache, jobs holding
+    # them keep running.
+    key = (os.path.abspath(gallery_dir), tolerance, index_kind, tuple(sorted(index_params.items())))
+    if image_paths is not None:
+        key += (_gallery_key(image_paths),)
+    with _recognizers_lock:
+        recognizer = _recognizers.pop(key, None)
+        if recognizer is None:
+            recognizer = FaceRecognizer(gallery_dir, tolerance, index_kind, **index_params)
+        _recognizers[key] = recognizer
+        while len(_recognizers) > MAX_CACHED_RECOGNIZERS:
+            _recognizers.popitem(last=False)
+    if image_paths is not None:
+        recognizer.load(image_paths)
+    return recognizer
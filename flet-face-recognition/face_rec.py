@@ -1,201 +1,811 @@
-import face_recognition
-import cv2
-import os
-import base64
-from utils import get_name_from_filename
-
-def run_face_recognition_webcam(image_paths, update_frame, stop_event):
-    # Load images and create face encodings
-    known_faces = []
-    known_names = []
-
-    for image_path in image_paths:
-        image = face_recognition.load_image_file(image_path)
-        face_encodings = face_recognition.face_encodings(image)
-        if face_encodings:  # at least one face is found
-            known_faces.append(face_encodings[0])
-            known_names.append(get_name_from_filename(image_path))
-
-    if not known_faces:
-        raise ValueError("No faces found in the uploaded images.")
-
-    # Open the webcam with reduced resolution
-    video_capture = cv2.VideoCapture(0)
-    video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Reduce width
-    video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)  # Reduce height
-
-    frame_skip = 2  # Process every 2nd frame
-    frame_count = 0
-
-    while not stop_event.is_set():
-        ret, frame = video_capture.read()
-
-        if not ret:
-            break
-
-        frame_count += 1
-        if frame_count % frame_skip != 0:
-            continue  
-
-        # resize the frame for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-
-        face_locations = face_recognition.face_locations(small_frame)
-        face_encodings = face_recognition.face_encodings(small_frame, face_locations)
-
-        face_names = []
-        for face_encoding in face_encodings:
-            match = face_recognition.compare_faces(known_faces, face_encoding, tolerance=0.50)
-            name = "Unknown"
-            for i, is_match in enumerate(match):
-                if is_match:
-                    name = known_names[i]
-                    break
-            face_names.append(name)
-
-        for (top, right, bottom, left), name in zip(face_locations, face_names):
-            # Make bigger face locations since the frame was resized
-            top *= 2
-            right *= 2
-            bottom *= 2
-            left *= 2
-
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-            cv2.rectangle(frame, (left, bottom - 25), (right, bottom), (0, 0, 255), cv2.FILLED)
-            font = cv2.FONT_HERSHEY_DUPLEX
-            cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.5, (255, 255, 255), 1)
-
-        # convert to a format that can be displayed in Flet
-        _, buffer = cv2.imencode(".jpg", frame)
-        img_bytes = buffer.tobytes()
-
-        # Encode the image bytes to base64
-        img_base64 = base64.b64encode(img_bytes).decode("utf-8")
-
-        # Update the frame in the UI
-        if callable(update_frame):
-            update_frame(img_base64)
-
-    # Release the webcam and close cv windows
-    video_capture.release()
-    cv2.destroyAllWindows()
-
-def run_face_recognition_video(video_path, image_paths, output_video_path, update_progress, update_found_names):
-    input_movie = cv2.VideoCapture(video_path)
-    if not input_movie.isOpened():
-        raise ValueError(f"Could not open video file: {video_path}")
-
-    length = int(input_movie.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_width = int(input_movie.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(input_movie.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    frame_rate = input_movie.get(cv2.CAP_PROP_FPS)
-
-    # Ensure the output directory exists
-    output_dir = os.path.dirname(output_video_path)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    output_movie = cv2.VideoWriter(output_video_path, fourcc, frame_rate, (frame_width, frame_height))
-
-    if not output_movie.isOpened():
-        raise ValueError(f"Could not create output video file: {output_video_path}")
-
-
-    known_faces = []
-    known_names = []
-
-    for image_path in image_paths:
-        image = face_recognition.load_image_file(image_path)
-        face_encodings = face_recognition.face_encodings(image)
-        if face_encodings:  # aasfds
-            known_faces.append(face_encodings[0])
-            known_names.append(get_name_from_filename(image_path))
-
-    if not known_faces:
-        raise ValueError("No faces found in the uploaded images.")
-
-  
-    face_locations = []
-    face_encodings = []
-    face_names = []
-    frame_number = 0
-    found_names = set()  # Save unique names found in the video
-
-    while True:
-        ret, frame = input_movie.read()
-        frame_number += 1
-        if not ret:
-            break
-
-        # update progress
-        if callable(update_progress):
-            update_progress(frame_number / length)
-
-        # detect faces in the frame
-        face_locations = face_recognition.face_locations(frame)
-        face_encodings = face_recognition.face_encodings(frame, face_locations)
-
-        face_names = []
-        for face_encoding in face_encodings:
-            match = face_recognition.compare_faces(known_faces, face_encoding, tolerance=0.50)
-            name = "Unknown"
-            for i, is_match in enumerate(match):
-                if is_match:
-                    name = known_names[i]
-                    found_names.add(name)  # Add found name to the set
-                    break
-            face_names.append(name)
-
-        #   draw rectangles and labels on the frame
-        for (top, right, bottom, left), name in zip(face_locations, face_names):
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-            cv2.rectangle(frame, (left, bottom - 25), (right, bottom), (0, 0, 255), cv2.FILLED)
-            font = cv2.FONT_HERSHEY_DUPLEX
-            cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.5, (255, 255, 255), 1)
-
-        output_movie.write(frame)
-
-        # Update the found names on the UI
-        if callable(update_found_names):
-            update_found_names(found_names)
-
-    input_movie.release()
-    output_movie.release()
-
-def run_face_recognition_image(target_image_path, known_image_paths, output_image_path):
-    target_image = face_recognition.load_image_file(target_image_path)
-    target_face_locations = face_recognition.face_locations(target_image)
-    target_face_encodings = face_recognition.face_encodings(target_image, target_face_locations)
-
-    known_faces = []
-    known_names = []
-
-    for image_path in known_image_paths:
-        image = face_recognition.load_image_file(image_path)
-        face_encodings = face_recognition.face_encodings(image)
-        if face_encodings:  # Ensure at least one face is found
-            known_faces.append(face_encodings[0])
-            known_names.append(get_name_from_filename(image_path))
-
-    if not known_faces:
-        raise ValueError("No faces found in the uploaded images.")
-
-    # Recognize faces in the target image
-    face_names = []
-    for face_encoding in target_face_encodings:
-        match = face_recognition.compare_faces(known_faces, face_encoding, tolerance=0.50)
-        name = "Unknown"
-        for i, is_match in enumerate(match):
-            if is_match:
-                name = known_names[i]
-                break
-        face_names.append(name)
-
-    for (top, right, bottom, left), name in zip(target_face_locations, face_names):
-        cv2.rectangle(target_image, (left, top), (right, bottom), (0, 0, 255), 2)
-        cv2.rectangle(target_image, (left, bottom - 25), (right, bottom), (0, 0, 255), cv2.FILLED)
-        font = cv2.FONT_HERSHEY_DUPLEX
-        cv2.putText(target_image, name, (left + 6, bottom - 6), font, 0.5, (255, 255, 255), 1)
-
-    cv2.imwrite(output_image_path, cv2.cvtColor(target_image, cv2.COLOR_RGB2BGR))
\ No newline at end of file
+import face_recognition
+import cv2
+import os
+import asyncio
+import queue
+import time
+import threading
+import multiprocessing
+from collections import deque
+# load_matcher, recognize_faces and draw_faces used to live here and are still importable
+from appearances import AppearanceIndex, default_appearances_path
+from video_jobs import JobOptions, load_checkpoint, remove_checkpoint, resolve_frame_range, save_checkpoint
+from video_output import OutputOptions, VideoOutput
+from engine import DetectionOptions, check_recognizer_options, get_recognizer, load_matcher, recognize_faces, draw_faces
+from gallery import DEFAULT_GALLERY_DIR
+from gallery_index import DEFAULT_INDEX
+from matching import DEFAULT_TOLERANCE, UNKNOWN_NAME
+from tracking import DEFAULT_REFRESH_EVERY
+from streams import CaptureThread, FrameSlot
+from transport import FrameTransport
+from metrics import NULL_STATS, RecognitionStats, SampleRecorder
+from motion import make_motion_gate
+
+def _loaded_recognizer(recognizer, image_paths, gallery_dir, tolerance, index_kind, index_params):
+    # One shared engine per gallery and setting, unless the caller brings its own
+    check_recognizer_options(index_kind, index_params)
+    if recognizer is None:
+        return get_recognizer(gallery_dir, tolerance, index_kind, image_paths, **index_params)
+    return recognizer.load(image_paths)
+
+def _next_frame(frames, seq, timeout, buffer, copy, stats):
+    # With copy (buffer pool mode) the frame is copied into buffer, the caller's
+    # own, so the capture can read into the one it replaced. Returns (seq, frame, put time).
+    if not copy:
+        return frames.get_timed(seq, timeout)
+    seq, frame, captured = frames.get_into(buffer, seq, timeout)
+    if frame is not None and frame is not buffer:
+        stats.count("frame_allocations")
+    return seq, frame, captured
+
+def _update_motion_gate(gate, tracker, face_locations):
+    # Faces in view, or tracks that have not expired yet, keep detection running
+    if gate is not None:
+        gate.active = bool(tracker.tracks) if tracker is not None else bool(face_locations)
+
+def _run_webcam_inference(frames, annotations, recognizer, tracker, stop, update_faces, stats, buffer_pool=False, gate=None):
+    seq = 0
+    frame = None
+    while not stop.is_set():
+        seq, next_frame, _ = _next_frame(frames, seq, 0.5, frame, buffer_pool, stats)
+        if next_frame is None:
+            if frames.closed:
+                break
+            continue
+        frame = next_frame
+        if gate is not None and not gate.should_detect(frame):
+            stats.count("frames_static")
+            continue
+
+        # detect on a half size frame and match every face against the gallery in one go
+        face_locations, matches = recognizer.process_frame(frame, tracker, scale=0.5, stats=stats)
+        _update_motion_gate(gate, tracker, face_locations)
+        annotations.put((face_locations, [match.name for match in matches]))
+
+        # Structured results for callers that do not need the drawn frames
+        if callable(update_faces):
+            update_faces(face_locations, matches)
+
+def run_face_recognition_webcam(image_paths, update_frame, stop_event, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, track_refresh_every=DEFAULT_REFRESH_EVERY, source=0, transport=None, update_faces=None, stats=None, stats_path=None, buffer_pool=False, motion=None, recognizer=None, **index_params):
+    recognizer = _loaded_recognizer(recognizer, image_paths, gallery_dir, tolerance, index_kind, index_params)
+    # Keep identities of faces between frames, track_refresh_every=None disables tracking
+    tracker = recognizer.new_tracker(track_refresh_every)
+    # Metrics are only collected when a stats object or a dump file is given
+    if stats is None:
+        stats = RecognitionStats() if stats_path else NULL_STATS
+
+    # Capture, inference and display run as separate stages so slow inference
+    # never stalls the camera. Each hand-off only holds the newest item.
+    stop = threading.Event()
+    # buffer_pool reuses preallocated frame buffers in every stage instead of
+    # allocating new frames for each captured, drawn and scaled frame
+    capture = CaptureThread(source, stop, width=640, height=480, stats=stats, buffer_pool=buffer_pool)  # Reduce resolution
+    if not capture.is_opened():
+        raise ValueError(f"Could not open video source: {source}")
+
+    # Frames go to the UI through a transport that scales, encodes and skips
+    # frames while the UI is still busy with the previous one. Without
+    # update_frame or transport (headless) nothing is drawn or encoded.
+    if transport is None and callable(update_frame):
+        transport = FrameTransport(update_frame, buffer_pool=buffer_pool)
+    if transport is not None:
+        transport.stats_recorder = stats
+        transport.start()
+
+    annotations = FrameSlot()
+    inference = threading.Thread(
+        target=_run_webcam_inference,
+        # With motion (MotionOptions), detection only runs on frames with motion or while faces are tracked
+        args=(capture.frames, annotations, recognizer, tracker, stop, update_faces, stats, buffer_pool, make_motion_gate(motion)),
+        daemon=True,
+    )
+    capture.start()
+    inference.start()
+
+    seq = 0
+    display = None  # buffer pool: the frame buffer drawn on next
+    face_locations, face_names = [], []
+    last_dump = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            seq, frame, _ = _next_frame(capture.frames, seq, 0.5, display, buffer_pool and transport is not None, stats)
+            if frame is None:
+                if capture.frames.closed:
+                    break
+                continue
+
+            stats.set("frames_dropped", capture.frames.dropped)
+            if stats_path and time.monotonic() - last_dump >= 1.0:
+                last_dump = time.monotonic()
+                stats.dump(stats_path)
+
+            if transport is None:
+                continue
+
+            # draw the most recent annotations on the freshest frame
+            _, latest = annotations.latest()
+            if latest is not None:
+                face_locations, face_names = latest
+            start = stats.clock()
+            if not buffer_pool:
+                frame = frame.copy()  # the inference stage may still be reading it
+                stats.count("frame_allocations")
+            draw_faces(frame, face_locations, face_names)
+            stats.add_time("draw", start)
+
+            # Update the frame in the UI, in buffer pool mode the transport
+            # hands back a buffer it no longer needs
+            display = transport.send(frame)
+    finally:
+        # Stop the capture, inference and transport stages, the capture releases the webcam
+        stop.set()
+        inference.join()
+        capture.join()
+        if transport is not None:
+            transport.close()
+        if stats_path:
+            stats.dump(stats_path)
+
+class _CameraStream:
+    # One source of the multi camera mode: its capture, tracker, stats and latest annotations
+    def __init__(self, index, source, recognizer, track_refresh_every, buffer_pool=False, gate=None):
+        self.index = index
+        self.source = source
+        self.buffer_pool = buffer_pool
+        self.stats = RecognitionStats()
+        self.stop = threading.Event()
+        self.capture = CaptureThread(source, self.stop, width=640, height=480, stats=self.stats, buffer_pool=buffer_pool)
+        self.tracker = recognizer.new_tracker(track_refresh_every)
+        self.gate = gate
+        self.annotations = FrameSlot()
+        self.busy = threading.Lock()  # one inference at a time per stream, its tracker is not shared
+        self.inference_seq = 0
+        self.display_seq = 0
+        self.inference_frame = None  # buffer pool: this stream's frame buffers
+        self.display_frame = None
+
+    def summary(self):
+        snapshot = self.stats.snapshot()
+        latency = snapshot["stages"].get("latency", {})
+        return {
+            "source": self.source,
+            "fps_in": round(snapshot["fps_in"], 2),
+            "fps_processed": round(snapshot["fps_processed"], 2),
+            "frames_dropped": self.capture.frames.dropped,
+            "latency_ms_p50": round(latency.get("p50_ms", 0.0), 1),
+            "latency_ms_p95": round(latency.get("p95_ms", 0.0), 1),
+            "faces": snapshot["counters"]["faces"],
+        }
+
+def _run_multi_inference(streams, recognizer, stop, update_faces, position):
+    # Each worker goes round the streams and takes the newest frame of the next
+    # stream that no other worker is processing, so every camera gets a fair
+    # share of the pool and a busy one never holds up the others
+    while not stop.is_set():
+        stream = None
+        for offset in range(len(streams)):
+            candidate = streams[(position + offset) % len(streams)]
+            if not candidate.busy.acquire(blocking=False):
+                continue
+            seq, frame, captured = _next_frame(
+                candidate.capture.frames, candidate.inference_seq, 0, candidate.inference_frame, candidate.buffer_pool, candidate.stats
+            )
+            if frame is None:
+                candidate.busy.release()
+                continue
+            stream = candidate
+            position = (position + offset + 1) % len(streams)
+            break
+
+        if stream is None:
+            if all(candidate.capture.frames.closed for candidate in streams):
+                break
+            stop.wait(0.005)
+            continue
+
+        try:
+            stream.inference_seq = seq
+            stream.inference_frame = frame
+            if stream.gate is not None and not stream.gate.should_detect(frame):
+                stream.stats.count("frames_static")
+                continue
+            face_locations, matches = recognizer.process_frame(frame, stream.tracker, scale=0.5, stats=stream.stats)
+            _update_motion_gate(stream.gate, stream.tracker, face_locations)
+            # From the capture to the recognized result, including time spent waiting for a worker
+            stream.stats.add_samples([("latency", time.monotonic() - captured)])
+            stream.annotations.put((face_locations, [match.name for match in matches]))
+        finally:
+            stream.busy.release()
+        if callable(update_faces):
+            update_faces(stream.index, face_locations, matches)
+
+def run_face_recognition_multi_webcam(sources, image_paths, update_frame, stop_event, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, track_refresh_every=DEFAULT_REFRESH_EVERY, inference_workers=None, transports=None, update_faces=None, update_stats=None, stats_interval=1.0, buffer_pool=False, motion=None, recognizer=None, **index_params):
+    # Several cameras, files or stream URLs at once. Every source has its own
+    # capture thread and tracker; all share one loaded gallery and a bounded
+    # pool of inference_workers threads (default: one per source, at most one
+    # per core). update_frame(index, img_base64), update_faces(index, locations,
+    # matches) and update_stats({index: summary}) identify the source by index.
+    recognizer = _loaded_recognizer(recognizer, image_paths, gallery_dir, tolerance, index_kind, index_params)
+    if inference_workers is None:
+        inference_workers = min(len(sources), os.cpu_count() or 1)
+
+    streams = [
+        _CameraStream(index, source, recognizer, track_refresh_every, buffer_pool, make_motion_gate(motion))
+        for index, source in enumerate(sources)
+    ]
+    for stream in streams:
+        if not stream.capture.is_opened():
+            for opened in streams:
+                opened.capture.release()
+            raise ValueError(f"Could not open video source: {stream.source}")
+
+    if transports is None and callable(update_frame):
+        transports = [
+            FrameTransport(lambda img_base64, index=index: update_frame(index, img_base64), buffer_pool=buffer_pool)
+            for index in range(len(streams))
+        ]
+    for stream, transport in zip(streams, transports or []):
+        transport.stats_recorder = stream.stats
+        transport.start()
+
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=_run_multi_inference, args=(streams, recognizer, stop, update_faces, i % len(streams)), daemon=True)
+        for i in range(max(1, inference_workers))
+    ]
+    for stream in streams:
+        stream.capture.start()
+    for worker in workers:
+        worker.start()
+
+    last_stats = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            shown = False
+            if transports:
+                for stream, transport in zip(streams, transports):
+                    # draw the most recent annotations on the freshest frame of each source
+                    seq, frame, _ = _next_frame(
+                        stream.capture.frames, stream.display_seq, 0, stream.display_frame, buffer_pool, stream.stats
+                    )
+                    if frame is None:
+                        continue
+                    stream.display_seq = seq
+                    _, latest = stream.annotations.latest()
+                    start = stream.stats.clock()
+                    if not buffer_pool:
+                        frame = frame.copy()  # an inference worker may still be reading it
+                        stream.stats.count("frame_allocations")
+                    if latest is not None:
+                        draw_faces(frame, *latest)
+                    stream.stats.add_time("draw", start)
+                    stream.display_frame = transport.send(frame)
+                    shown = True
+
+            if time.monotonic() - last_stats >= stats_interval:
+                last_stats = time.monotonic()
+                for stream in streams:
+                    stream.stats.set("frames_dropped", stream.capture.frames.dropped)
+                if callable(update_stats):
+                    update_stats({stream.index: stream.summary() for stream in streams})
+
+            if all(stream.capture.frames.closed for stream in streams):
+                break
+            if not shown:
+                stop_event.wait(0.005)
+    finally:
+        stop.set()
+        for stream in streams:
+            stream.stop.set()
+        for worker in workers:
+            worker.join()
+        for stream in streams:
+            stream.capture.join()
+        for transport in transports or []:
+            transport.close()
+    if callable(update_stats):
+        update_stats({stream.index: stream.summary() for stream in streams})
+
+def _is_detection_frame(frame_number, detect_every):
+    return (frame_number - 1) % detect_every == 0
+
+def _read_video_batches(input_movie, detection, stats, first_frame=1, last_frame=None, gate=None):
+    # Groups decoded (frame_number, frame, detect) so that each group ends with
+    # detection.batch_size detection frames, or holds as many frames as that would
+    # normally take when the motion gate skips detections. The capture is
+    # already positioned at first_frame, reading stops after last_frame.
+    detect_every, batch_size = detection.detect_every, detection.batch_size
+    frame_number = first_frame - 1
+    batch = []
+    detections = 0
+    while last_frame is None or frame_number < last_frame:
+        start = stats.clock()
+        ret, frame = input_movie.read()
+        if not ret:
+            break
+        stats.add_time("decode", start)
+        stats.count("frames_in")
+        frame_number += 1
+        detect = _is_detection_frame(frame_number, detect_every)
+        if detect and gate is not None and not gate.should_detect(frame):
+            detect = False
+            stats.count("frames_static")
+        batch.append((frame_number, frame, detect))
+        detections += detect
+        if detections == batch_size or len(batch) >= batch_size * detect_every:
+            yield batch
+            batch = []
+            detections = 0
+    if batch:
+        yield batch
+
+def _recognize_numbered_frames(recognizer, numbered_frames, detection, tracker, stats):
+    # Detection and encoding run on batch_size frames at a time, results are mapped back by frame number
+    results = {}
+    for i in range(0, len(numbered_frames), detection.batch_size):
+        batch = numbered_frames[i:i + detection.batch_size]
+        recognized = recognizer.process_batch(
+            [frame for _, frame in batch], tracker, detection.detect_scale, stats, detection.detect_model, detection.upsample
+        )
+        results.update((frame_number, result) for (frame_number, _), result in zip(batch, recognized))
+    return results
+
+def _recognize_video_frames(input_movie, recognizer, detection, stats, first_frame=1, last_frame=None, gate=None):
+    tracker = recognizer.new_tracker(detection.track_refresh_every)
+    face_locations, matches = [], []
+    for batch in _read_video_batches(input_movie, detection, stats, first_frame, last_frame, gate):
+        detection_frames = [(frame_number, frame) for frame_number, frame, detect in batch if detect]
+        results = _recognize_numbered_frames(recognizer, detection_frames, detection, tracker, stats)
+        stats.count("frames_skipped", len(batch) - len(detection_frames))
+
+        for frame_number, frame, _ in batch:
+            # Frames between detections keep the last boxes and labels
+            if frame_number in results:
+                face_locations, matches = results[frame_number]
+            yield frame_number, frame, face_locations, matches
+        if detection_frames:
+            _update_motion_gate(gate, tracker, face_locations)
+
+# Video pipeline workers, each process keeps its own copy of the recognizer
+_worker_state = {}
+
+def _init_video_worker(recognizer, detection, collect_stats):
+    _worker_state["recognizer"] = recognizer
+    _worker_state["detection"] = detection
+    _worker_state["collect_stats"] = collect_stats
+
+def _process_video_chunk(chunk):
+    # Chunks of one worker are not consecutive, so tracks only live within a chunk
+    recognizer = _worker_state["recognizer"]
+    detection = _worker_state["detection"]
+    tracker = recognizer.new_tracker(detection.track_refresh_every)
+    # Stage timings are sent back with the results and merged in the main process
+    recorder = SampleRecorder() if _worker_state["collect_stats"] else NULL_STATS
+
+    recognized = _recognize_numbered_frames(recognizer, chunk, detection, tracker, recorder)
+    results = [(frame_number, face_locations, matches) for frame_number, (face_locations, matches) in recognized.items()]
+    return results, getattr(recorder, "samples", []), getattr(recorder, "face_counts", [])
+
+def _decode_video_chunks(input_movie, chunk_size, chunks, stop, stats, first_frame=1, last_frame=None):
+    # Ends with None, or with the exception that stopped decoding so the
+    # consumer raises it instead of waiting for chunks that never come
+    try:
+        frame_number = first_frame - 1
+        chunk = []
+        while not stop.is_set() and (last_frame is None or frame_number < last_frame):
+            start = stats.clock()
+            ret, frame = input_movie.read()
+            if not ret:
+                break
+            stats.add_time("decode", start)
+            stats.count("frames_in")
+            frame_number += 1
+            chunk.append((frame_number, frame))
+            if len(chunk) == chunk_size:
+                _put_until_stopped(chunks, chunk, stop)
+                chunk = []
+        if chunk:
+            _put_until_stopped(chunks, chunk, stop)
+    except BaseException as ex:
+        _put_until_stopped(chunks, ex, stop)
+        return
+    _put_until_stopped(chunks, None, stop)
+
+def _put_until_stopped(chunks, item, stop):
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+def _recognize_video_frames_parallel(input_movie, recognizer, workers, chunk_size, detection, stats, first_frame=1, last_frame=None, gate=None):
+    max_in_flight = workers * 2  # one chunk running and one queued per worker
+    chunks = queue.Queue(maxsize=max_in_flight)
+    stop = threading.Event()
+    pending = deque()
+    decoded_all = False
+    face_locations, matches = [], []
+
+    # Start the pool before the decoder thread so workers are not forked mid-read
+    with multiprocessing.Pool(workers, initializer=_init_video_worker, initargs=(recognizer, detection, stats.enabled)) as pool:
+        decoder = threading.Thread(
+            target=_decode_video_chunks,
+            args=(input_movie, chunk_size, chunks, stop, stats, first_frame, last_frame),
+            daemon=True,
+        )
+        decoder.start()
+        try:
+            while True:
+                while not decoded_all and len(pending) < max_in_flight:
+                    chunk = chunks.get()
+                    if chunk is None:
+                        decoded_all = True
+                        break
+                    if isinstance(chunk, BaseException):
+                        raise chunk
+                    # Only the detection frames are sent to the workers. The motion
+                    # gate runs here and knows about faces from the chunks
+                    # collected so far, workers keep their own trackers.
+                    detection_chunk = []
+                    for frame_number, frame in chunk:
+                        if not _is_detection_frame(frame_number, detection.detect_every):
+                            continue
+                        if gate is not None and not gate.should_detect(frame):
+                            stats.count("frames_static")
+                            continue
+                        detection_chunk.append((frame_number, frame))
+                    pending.append((chunk, pool.apply_async(_process_video_chunk, (detection_chunk,))))
+
+                if not pending:
+                    break
+
+                # Chunks are collected in submission order, so frames leave in frame_number order
+                # Recognition runs in the workers, "wait" is the time spent waiting for them
+                chunk, result = pending.popleft()
+                start = stats.clock()
+                chunk_results, samples, face_counts = result.get()
+                stats.add_time("wait", start)
+
+                stats.add_samples(samples)
+                for face_count in face_counts:
+                    stats.faces(face_count)
+                stats.count("frames_processed", len(chunk_results))
+                stats.count("frames_skipped", len(chunk) - len(chunk_results))
+                results = {frame_number: (locations, names) for frame_number, locations, names in chunk_results}
+                for frame_number, frame in chunk:
+                    # Frames between detections keep the last boxes and labels
+                    if frame_number in results:
+                        face_locations, matches = results[frame_number]
+                    yield frame_number, frame, face_locations, matches
+                if results:
+                    _update_motion_gate(gate, None, face_locations)
+        finally:
+            stop.set()
+            decoder.join()
+
+def run_face_recognition_video(video_path, image_paths, output_video_path, update_progress, update_found_names, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, workers=1, chunk_size=8, detection=None, output=None, job=None, motion=None, stop_event=None, update_stats=None, progress_interval=0.1, stats=None, stats_path=None, recognizer=None, **index_params):
+    # The settings come in groups: detection (DetectionOptions), output
+    # (OutputOptions), job (JobOptions: frame range and checkpoints) and
+    # motion (MotionOptions, None recognizes every detection frame)
+    detection = detection or DetectionOptions()
+    output = output or OutputOptions()
+    job = job or JobOptions()
+
+    # The gallery is loaded (and the options checked) before the video and
+    # the output are opened
+    recognizer = _loaded_recognizer(recognizer, image_paths, gallery_dir, tolerance, index_kind, index_params)
+
+    input_movie = cv2.VideoCapture(video_path)
+    if not input_movie.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+
+    output_movie = None
+    try:
+        length = int(input_movie.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_width = int(input_movie.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(input_movie.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_rate = input_movie.get(cv2.CAP_PROP_FPS)
+
+        # Only frames first_frame..last_frame are processed (start/end as frame
+        # indexes like a slice, or in seconds). A job with a checkpoint_path saves
+        # its state every checkpoint_every frames and when it is stopped, and
+        # continues from there when it is started again.
+        checkpoint_path = job.checkpoint_path
+        first_frame, last_frame = resolve_frame_range(frame_rate, length, job.start_frame, job.end_frame, job.start_time, job.end_time)
+        checkpoint = load_checkpoint(checkpoint_path, video_path, first_frame, last_frame)
+        resume_frame = checkpoint["next_frame"] if checkpoint else first_frame
+        if resume_frame > 1:
+            input_movie.set(cv2.CAP_PROP_POS_FRAMES, resume_frame - 1)
+        total_frames = (last_frame or length) - first_frame + 1
+
+        # output_mode "all" writes every annotated frame, "faces" only frames with
+        # faces, "clips" one file per stretch with faces and "none" nothing at all.
+        # Checkpointed jobs write parts that are joined at the end.
+        output_movie = VideoOutput(
+            output_video_path, output.output_mode, frame_rate, (frame_width, frame_height), output.clip_gap,
+            parts=bool(checkpoint_path), state=checkpoint["output"] if checkpoint else None,
+        )
+
+        # With motion, frames without motion (and no faces in view) skip
+        # detection, one is still checked every check_every frames
+        gate = make_motion_gate(motion)
+
+        # workers=None uses every core, workers=1 keeps everything in this process
+        if workers is None:
+            workers = os.cpu_count() or 1
+        # Metrics are only collected when asked for, otherwise every timer is a no-op
+        if stats is None:
+            stats = RecognitionStats() if update_stats or stats_path else NULL_STATS
+
+        if workers > 1:
+            recognized_frames = _recognize_video_frames_parallel(input_movie, recognizer, workers, max(chunk_size, detection.batch_size), detection, stats, resume_frame, last_frame, gate)
+        else:
+            recognized_frames = _recognize_video_frames(input_movie, recognizer, detection, stats, resume_frame, last_frame, gate)
+
+        found_names = set(checkpoint["found_names"]) if checkpoint else set()  # Save unique names found in the video
+        # When and where each identity appears, saved next to the output when asked for
+        # (appearances_path=True uses the default <output>.faces.db)
+        appearances = None
+        if checkpoint and checkpoint["appearances"]:
+            appearances = AppearanceIndex.from_state(checkpoint["appearances"])
+        elif output.appearances_path:
+            appearances = AppearanceIndex(frame_rate)
+    except BaseException:
+        input_movie.release()
+        if output_movie is not None:
+            output_movie.close()
+        raise
+
+    started = time.monotonic()
+    last_report = 0.0
+    last_checkpoint = resume_frame - 1
+    frame_number = resume_frame - 1
+    completed = False
+
+    def save_job_checkpoint():
+        # Everything written so far becomes complete files before the state is saved
+        output_movie.split()
+        save_checkpoint(checkpoint_path, video_path, first_frame, last_frame, frame_number + 1, found_names, output_movie.state(), appearances)
+
+    def report():
+        # update progress, throughput and found names on the UI
+        frames_done = frame_number - first_frame + 1
+        if callable(update_progress):
+            update_progress(frames_done / total_frames if total_frames > 0 else 0)
+        if callable(update_stats):
+            elapsed = time.monotonic() - started
+            frames_this_run = frame_number - resume_frame + 1
+            fps = frames_this_run / elapsed if elapsed > 0 else 0.0
+            update_stats({
+                "frames": frames_done,
+                "total_frames": total_frames,
+                "fps": fps,
+                "eta_seconds": (total_frames - frames_done) / fps if fps > 0 and total_frames > frames_done else 0.0,
+                "stage_ms": {
+                    stage: stats.stage_seconds(stage) * 1000 / max(1, frames_this_run)
+                    for stage in ("decode", "detect", "encode", "match", "wait", "draw", "write")
+                    if stats.stage_seconds(stage)
+                },
+            })
+        if stats_path:
+            stats.dump(stats_path)
+        if callable(update_found_names):
+            update_found_names(found_names)
+
+    try:
+        for frame_number, frame, face_locations, matches in recognized_frames:
+            face_names = []
+            for match in matches:
+                if match.name != UNKNOWN_NAME:
+                    found_names.add(match.name)  # Add found name to the set
+                face_names.append(match.name)
+
+            if appearances is not None:
+                appearances.add(frame_number, frame, face_locations, matches)
+
+            if output_movie.draws:
+                #   draw rectangles and labels on the frame
+                start = stats.clock()
+                draw_faces(frame, face_locations, face_names)
+                stats.add_time("draw", start)
+
+                start = stats.clock()
+                output_movie.write(frame, bool(face_locations))
+                stats.add_time("write", start)
+
+            # Callbacks are rate limited to one call per progress_interval seconds
+            now = time.monotonic()
+            if now - last_report >= progress_interval:
+                last_report = now
+                report()
+
+            if checkpoint_path and frame_number - last_checkpoint >= job.checkpoint_every:
+                last_checkpoint = frame_number
+                save_job_checkpoint()
+
+            if stop_event is not None and stop_event.is_set():
+                break
+        else:
+            completed = True
+
+        report()
+        if checkpoint_path and not completed:
+            # Stopped early, the next run with the same checkpoint_path continues here
+            save_job_checkpoint()
+    finally:
+        recognized_frames.close()
+        input_movie.release()
+        output_movie.close()
+
+    if completed or not checkpoint_path:
+        output_movie.finish()
+        if appearances is not None:
+            appearances_path = output.appearances_path
+            if not isinstance(appearances_path, str):
+                appearances_path = default_appearances_path(output_video_path or video_path)
+            appearances.save(appearances_path, video_path, output_video_path)
+        remove_checkpoint(checkpoint_path)
+    return found_names
+
+def run_face_recognition_image(target_image_path, known_image_paths, output_image_path, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, stats=None, stats_path=None, recognizer=None, **index_params):
+    if stats is None:
+        stats = RecognitionStats() if stats_path else NULL_STATS
+
+    recognizer = _loaded_recognizer(recognizer, known_image_paths, gallery_dir, tolerance, index_kind, index_params)
+
+    start = stats.clock()
+    target_image = face_recognition.load_image_file(target_image_path)
+    stats.add_time("decode", start)
+    stats.count("frames_in")
+
+    # Recognize faces in the target image
+    target_face_locations, matches = recognizer.process_frame(target_image, stats=stats)
+
+    if output_image_path:
+        start = stats.clock()
+        draw_faces(target_image, target_face_locations, [match.name for match in matches])
+        stats.add_time("draw", start)
+
+        start = stats.clock()
+        cv2.imwrite(output_image_path, cv2.cvtColor(target_image, cv2.COLOR_RGB2BGR))
+        stats.add_time("write", start)
+
+    if stats_path:
+        stats.dump(stats_path)
+    return target_face_locations, matches
+
+def face_records(face_locations, matches):
+    return [
+        {
+            "box": list(face_location),
+            "name": match.name,
+            "distance": round(match.distance, 4),
+            "confidence": round(match.confidence, 4),
+        }
+        for face_location, match in zip(face_locations, matches)
+    ]
+
+def _is_live_source(source):
+    # Device indexes and stream URLs are live sources, anything else is read as a file
+    return isinstance(source, int) or "://" in str(source)
+
+def _iter_file_results(source, recognizer, tracker, detection, stop, stats, gate=None):
+    input_movie = cv2.VideoCapture(source)
+    if not input_movie.isOpened():
+        raise ValueError(f"Could not open video file: {source}")
+    frame_rate = input_movie.get(cv2.CAP_PROP_FPS)
+    try:
+        # Frames are decoded only when the consumer asks for the next records
+        for batch in _read_video_batches(input_movie, detection, stats, gate=gate):
+            detection_frames = [(frame_number, frame) for frame_number, frame, detect in batch if detect]
+            results = _recognize_numbered_frames(recognizer, detection_frames, detection, tracker, stats)
+            for frame_number, frame in detection_frames:
+                timestamp = (frame_number - 1) / frame_rate if frame_rate > 0 else None
+                yield frame_number, timestamp, frame, results[frame_number]
+            if detection_frames:
+                _update_motion_gate(gate, tracker, results[detection_frames[-1][0]][0])
+            if stop.is_set():
+                break
+    finally:
+        input_movie.release()
+
+def _iter_live_results(source, recognizer, tracker, detection, stop, stats, gate=None):
+    # The capture keeps reading while the consumer is busy, frames it could not
+    # take in time are skipped so records never lag behind the camera
+    capture_stop = threading.Event()
+    capture = CaptureThread(source, capture_stop, stats=stats)
+    if not capture.is_opened():
+        raise ValueError(f"Could not open video source: {source}")
+    capture.start()
+    try:
+        seq = 0
+        while not stop.is_set():
+            seq, frame = capture.frames.get(seq, timeout=0.5)
+            if frame is None:
+                if capture.frames.closed:
+                    break
+                continue
+            stats.set("frames_dropped", capture.frames.dropped)
+            if gate is not None and not gate.should_detect(frame):
+                stats.count("frames_static")
+                continue
+            timestamp = time.time()
+            face_locations, matches = recognizer.process_frame(frame, tracker, detection.detect_scale, stats, detection.detect_model, detection.upsample)
+            _update_motion_gate(gate, tracker, face_locations)
+            yield seq, timestamp, frame, (face_locations, matches)
+    finally:
+        capture_stop.set()
+        capture.join()
+
+def iter_face_recognition_results(source, image_paths, gallery_dir=DEFAULT_GALLERY_DIR, tolerance=DEFAULT_TOLERANCE, index_kind=DEFAULT_INDEX, detection=None, include_frames=False, stop_event=None, stats=None, motion=None, recognizer=None, **index_params):
+    # Yields one record per recognized frame of a video file or capture device:
+    # {"frame": index, "timestamp": seconds, "faces": [{"box", "name", "distance", "confidence"}]}
+    # The timestamp is the position in a file, or the wall clock time for live
+    # sources. include_frames adds the BGR frame as "image". detection
+    # (DetectionOptions) tracks faces by default, live sources ignore
+    # detect_every and batch_size.
+    recognizer = _loaded_recognizer(recognizer, image_paths, gallery_dir, tolerance, index_kind, index_params)
+    if detection is None:
+        detection = DetectionOptions(track_refresh_every=DEFAULT_REFRESH_EVERY)
+    tracker = recognizer.new_tracker(detection.track_refresh_every)
+    if stats is None:
+        stats = NULL_STATS
+    stop = stop_event if stop_event is not None else threading.Event()
+    # Frames the motion gate skips are not recognized and get no record
+    gate = make_motion_gate(motion)
+
+    if _is_live_source(source):
+        results = _iter_live_results(source, recognizer, tracker, detection, stop, stats, gate)
+    else:
+        results = _iter_file_results(source, recognizer, tracker, detection, stop, stats, gate)
+
+    try:
+        for frame_number, timestamp, frame, (face_locations, matches) in results:
+            record = {"frame": frame_number, "timestamp": timestamp, "faces": face_records(face_locations, matches)}
+            if include_frames:
+                record["image"] = frame
+            yield record
+    finally:
+        results.close()
+
+async def stream_face_recognition_results(source, image_paths, max_queue=8, executor=None, **options):
+    # Async version of iter_face_recognition_results. Recognition runs in an
+    # executor thread and hands records over through a queue of max_queue
+    # records; when the consumer falls behind the producer waits, so files are
+    # never decoded further ahead than that. Leaving the loop early stops it.
+    loop = asyncio.get_running_loop()
+    records = asyncio.Queue(maxsize=max_queue)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(records.put(item), loop).result()
+
+    def produce():
+        try:
+            for record in iter_face_recognition_results(source, image_paths, stop_event=stop, **options):
+                put(record)
+                if stop.is_set():
+                    break
+        except Exception as ex:
+            put(ex)
+        else:
+            put(done)
+
+    producer = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await records.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Keep taking records so a producer waiting on a full queue can finish
+        while not producer.done():
+            while not records.empty():
+                records.get_nowait()
+            await asyncio.wait([producer], timeout=0.05)
@@ -0,0 +1,266 @@
+import os
+import json
+import glob
+import uuid
+import hashlib
+import multiprocessing
+import cv2
+import numpy as np
+import face_recognition
+from utils import get_identity_name
+from templates import DEFAULT_MAX_MEDOIDS, build_templates
+
+DEFAULT_GALLERY_DIR = "gallery_store"
+ENCODINGS_FILE = "encodings.npy"  # stores saved before encodings got versioned file names
+META_FILE = "meta.json"
+JOURNAL_FILE = "journal.jsonl"
+ENCODING_SIZE = 128
+DEFAULT_MAX_IMAGE_SIZE = 1024  # longest side known images are scaled down to before detection
+PARALLEL_MIN_IMAGES = 8  # fewer new images are encoded in this process, a pool is not worth starting
+
+
+class NoKnownFacesError(ValueError):
+    pass
+
+
+def file_hash(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def encode_known_image(image_path, max_size=DEFAULT_MAX_IMAGE_SIZE):
+    image = face_recognition.load_image_file(image_path)
+    # Photos straight from a camera are far larger than needed to find one face,
+    # and detection time grows with the pixel count
+    height, width = image.shape[:2]
+    if max_size and max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    face_encodings = face_recognition.face_encodings(image)
+    if face_encodings:  # at least one face is found
+        return face_encodings[0]
+    return None
+
+
+def _encode_job(job):
+    key, image_path, max_size = job
+    return key, encode_known_image(image_path, max_size)
+
+
+def _encode_jobs(jobs, workers):
+    # Yields (content hash, encoding) in completion order
+    if not workers:
+        workers = os.cpu_count() or 1
+    # Daemonic processes (e.g. batch workers) can not start a pool of their own
+    if workers == 1 or len(jobs) < PARALLEL_MIN_IMAGES or multiprocessing.current_process().daemon:
+        for job in jobs:
+            yield _encode_job(job)
+        return
+    with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+        yield from pool.imap_unordered(_encode_job, jobs)
+
+
+def _cache_key(content_hash, max_size):
+    # The same image encodes differently at another max_size
+    return f"{content_hash}:{max_size or 0}"
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class GalleryStore:
+    # Encodings live in a single .npy file (memory-mapped on load), one row per
+    # distinct image content and max_size. meta.json maps those keys to rows, names the
+    # current encodings file and keeps the mtime/size of every path seen so
+    # unchanged files are never re-hashed. New rows go to a new encodings file,
+    # a file that may still be mapped (by this or another store) is never
+    # replaced, Windows does not allow that.
+    # Encodings made since the last save are appended to a journal as they
+    # finish, so an interrupted enrolment resumes where it stopped.
+
+    def __init__(self, store_dir=DEFAULT_GALLERY_DIR):
+        self.store_dir = store_dir
+        self.encodings = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self.hashes = {}  # "content hash:max_size" -> row in encodings, or -1 if no face
+        self.files = {}  # absolute path -> {"mtime", "size", "hash"}
+        self._new_rows = []
+        self._encodings_file = None
+        self._dirty = False
+        self.rejected = []  # outlier images left out by the last sync()
+        self.load()
+
+    @property
+    def encodings_path(self):
+        return os.path.join(self.store_dir, self._encodings_file or ENCODINGS_FILE)
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.store_dir, META_FILE)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.store_dir, JOURNAL_FILE)
+
+    def load(self):
+        self._load_snapshot()
+        self._replay_journal()
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.meta_path):
+            return
+        for _ in range(3):
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                encodings_file = meta.get("encodings", ENCODINGS_FILE)
+                encodings = np.load(os.path.join(self.store_dir, encodings_file), mmap_mode="r")
+                break
+            except FileNotFoundError:
+                continue  # removed by a save in another process, meta.json names the new file
+            except (OSError, ValueError):
+                # A corrupt store is only a cache, start from scratch
+                return
+        else:
+            return
+        if encodings.ndim != 2 or encodings.shape[1] != ENCODING_SIZE:
+            return
+        self.encodings = encodings
+        self._encodings_file = encodings_file
+        self.hashes = meta.get("hashes", {})
+        self.files = meta.get("files", {})
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # cut off by an interrupted write
+                if entry["hash"] not in self.hashes:
+                    self._add(entry["hash"], entry["encoding"])
+
+    def save(self):
+        if not self._dirty:
+            return
+        if not os.path.exists(self.store_dir):
+            os.makedirs(self.store_dir)
+
+        # When only file stamps changed the encodings file is kept as it is
+        if self._new_rows or self._encodings_file is None:
+            encodings = np.vstack([np.asarray(self.encodings), np.array(self._new_rows).reshape(-1, ENCODING_SIZE)])
+            encodings_file = f"encodings-{uuid.uuid4().hex[:12]}.npy"
+            np.save(os.path.join(self.store_dir, encodings_file), encodings)
+            self._encodings_file = encodings_file
+            self.encodings = np.load(self.encodings_path, mmap_mode="r")
+            self._new_rows = []
+
+        # meta.json switches to the new file in one step, a crash before that
+        # leaves the previous store as it was
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"hashes": self.hashes, "files": self.files, "encodings": self._encodings_file}, f)
+        os.replace(tmp_meta, self.meta_path)
+        # Everything in the journal is in the snapshot now
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._remove_old_encodings()
+        self._dirty = False
+
+    def _remove_old_encodings(self):
+        for path in glob.glob(os.path.join(self.store_dir, "encodings*.npy")):
+            if os.path.basename(path) != self._encodings_file:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # still mapped by another store on Windows, removed by a later save
+
+    def _content_hash(self, image_path):
+        path = os.path.abspath(image_path)
+        stat = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return entry["hash"]
+
+        content_hash = file_hash(path)
+        self.files[path] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": content_hash}
+        self._dirty = True
+        return content_hash
+
+    def _add(self, key, encoding):
+        if encoding is None:
+            self.hashes[key] = -1
+        else:
+            self.hashes[key] = len(self.encodings) + len(self._new_rows)
+            self._new_rows.append(np.asarray(encoding, dtype=np.float64))
+        self._dirty = True
+
+    def _encoding(self, row):
+        if row < len(self.encodings):
+            return self.encodings[row]
+        return self._new_rows[row - len(self.encodings)]
+
+    def encodings_for(self, rows):
+        return np.array([self._encoding(row) for row in rows]).reshape(-1, ENCODING_SIZE)
+
+    def enroll(self, image_paths, workers=None, max_size=DEFAULT_MAX_IMAGE_SIZE, update_progress=None):
+        # Returns the encoding row of every image, -1 for images without a face.
+        # New or changed images are the only ones that run the models, across a
+        # process pool (workers=None: all cores). update_progress gets the
+        # fraction of them done.
+        keys = [_cache_key(self._content_hash(image_path), max_size) for image_path in image_paths]
+        jobs = {}
+        for image_path, key in zip(image_paths, keys):
+            if key not in self.hashes and key not in jobs:
+                jobs[key] = (key, image_path, max_size)
+
+        if jobs:
+            if not os.path.exists(self.store_dir):
+                os.makedirs(self.store_dir)
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                # An interrupted run can leave half a line, the next entry must not be glued onto it
+                if journal.tell() and not _ends_with_newline(self.journal_path):
+                    journal.write("\n")
+                for done, (key, encoding) in enumerate(_encode_jobs(list(jobs.values()), workers), 1):
+                    self._add(key, encoding)
+                    entry = {"hash": key, "encoding": None if encoding is None else [float(value) for value in encoding]}
+                    journal.write(json.dumps(entry) + "\n")
+                    journal.flush()
+                    if callable(update_progress):
+                        update_progress(done / len(jobs))
+        self.save()
+        return [self.hashes[key] for key in keys]
+
+    def sync(self, image_paths, grouping="prefix", max_medoids=DEFAULT_MAX_MEDOIDS, max_size=DEFAULT_MAX_IMAGE_SIZE):
+        # Images are grouped into identities and each identity becomes a small
+        # template (see templates.py), so matching cost grows with the number of
+        # people, not photos. max_medoids=None keeps one row per image.
+        paths = []
+        rows = []
+        for image_path, row in zip(image_paths, self.enroll(image_paths, max_size=max_size)):
+            if row >= 0:
+                paths.append(image_path)
+                rows.append(row)
+
+        known_faces = self.encodings_for(rows)
+        known_names = [get_identity_name(path, grouping) for path in paths]
+        self.rejected = []
+        if max_medoids is None or not known_names:
+            return known_faces, known_names
+        known_faces, known_names, rejected = build_templates(known_faces, known_names, max_medoids)
+        self.rejected = [paths[i] for i in rejected]
+        return known_faces, known_names
+
+
+def load_known_faces(image_paths, store_dir=DEFAULT_GALLERY_DIR, grouping="prefix", max_medoids=DEFAULT_MAX_MEDOIDS):
+    known_faces, known_names = GalleryStore(store_dir).sync(image_paths, grouping, max_medoids)
+    if not known_names:
+        raise NoKnownFacesError("No faces found in the uploaded images.")
+    return known_faces, known_names
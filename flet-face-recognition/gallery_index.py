@@ -0,0 +1,228 @@
+import os
+import json
+import hashlib
+import inspect
+import numpy as np
+
+INDEX_FILE = "index_{kind}.npz"
+
+
+def squared_norms(vectors):
+    return np.einsum("ij,ij->i", vectors, vectors)
+
+
+def pairwise_distances(queries, vectors, vectors_sq=None):
+    if vectors_sq is None:
+        vectors_sq = squared_norms(vectors)
+    # ||q - v||^2 = ||q||^2 + ||v||^2 - 2 q.v for every pair at once
+    distances = squared_norms(queries)[:, None] + vectors_sq[None, :] - 2.0 * (queries @ vectors.T)
+    np.maximum(distances, 0.0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def gallery_fingerprint(encodings):
+    encodings = np.ascontiguousarray(encodings, dtype=np.float64)
+    return hashlib.sha1(encodings.tobytes()).hexdigest()
+
+
+class BruteForceIndex:
+    # Exact search, distances to every gallery row in one matrix product
+    kind = "brute"
+
+    def __init__(self):
+        self.encodings = np.empty((0, 0))
+        self._encodings_sq = np.empty(0)
+        self.fingerprint = None
+        self.built_params = None
+
+    def __len__(self):
+        return len(self.encodings)
+
+    def params(self):
+        return {}
+
+    def build(self, encodings):
+        self.encodings = np.asarray(encodings, dtype=np.float64)
+        self._encodings_sq = squared_norms(self.encodings)
+        self.fingerprint = gallery_fingerprint(self.encodings)
+        self.built_params = self.params()
+        return self
+
+    def search(self, queries):
+        distances = pairwise_distances(queries, self.encodings, self._encodings_sq)
+        best = distances.argmin(axis=1)
+        return best, distances[np.arange(len(best)), best]
+
+    def _arrays(self):
+        return {"encodings": self.encodings}
+
+    def _restore(self, arrays):
+        self.encodings = arrays["encodings"]
+        self._encodings_sq = squared_norms(self.encodings)
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            kind=self.kind,
+            fingerprint=self.fingerprint,
+            params=json.dumps(self.params()),
+            **self._arrays(),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **params):
+        with np.load(path) as data:
+            if str(data["kind"]) != cls.kind:
+                raise ValueError(f"Index file {path} is not a {cls.kind} index")
+            index = cls(**params)
+            index.fingerprint = str(data["fingerprint"])
+            index.built_params = json.loads(str(data["params"]))
+            index._restore({key: data[key] for key in data.files})
+        return index
+
+
+class IVFIndex(BruteForceIndex):
+    # Inverted-file index: k-means partitions the gallery into lists and a query
+    # is only compared against the rows of its n_probe closest lists. n_probe is
+    # the recall knob, n_probe >= n_lists gives exact results.
+    kind = "ivf"
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = np.empty((0, 0))
+        self.row_ids = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def params(self):
+        return {"n_lists": self.n_lists, "n_iter": self.n_iter, "seed": self.seed}
+
+    def _kmeans(self, encodings, n_lists):
+        rng = np.random.RandomState(self.seed)
+        # Training on a sample keeps build time bounded for huge galleries
+        sample_size = min(len(encodings), 256 * n_lists)
+        sample = encodings[rng.choice(len(encodings), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignment = pairwise_distances(sample, centroids).argmin(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        return centroids
+
+    def build(self, encodings):
+        super().build(encodings)
+        count = len(self.encodings)
+        if count == 0:
+            return self
+
+        n_lists = self.n_lists or int(np.sqrt(count))
+        n_lists = max(1, min(n_lists, count))
+        self.centroids = self._kmeans(self.encodings, n_lists)
+
+        # Store the rows list by list so each list is a contiguous slice
+        assignment = pairwise_distances(self.encodings, self.centroids).argmin(axis=1)
+        self.row_ids = np.argsort(assignment, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_lists))))
+        self._lists = self.encodings[self.row_ids]
+        self._lists_sq = self._encodings_sq[self.row_ids]
+        return self
+
+    def search(self, queries):
+        queries = np.asarray(queries, dtype=np.float64)
+        n_probe = min(self.n_probe, len(self.centroids))
+        if n_probe >= len(self.centroids):
+            return super().search(queries)
+
+        probe_lists = np.argpartition(pairwise_distances(queries, self.centroids), n_probe - 1, axis=1)[:, :n_probe]
+        best = np.full(len(queries), -1, dtype=np.int64)
+        best_distances = np.full(len(queries), np.inf)
+        # Invert the probe table so each probed list is scanned once for all
+        # the queries that selected it, as a contiguous slice without copies
+        for list_id in np.unique(probe_lists):
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            query_ids = np.nonzero((probe_lists == list_id).any(axis=1))[0]
+            distances = pairwise_distances(queries[query_ids], self._lists[start:end], self._lists_sq[start:end])
+            nearest = distances.argmin(axis=1)
+            nearest_distances = distances[np.arange(len(query_ids)), nearest]
+            better = nearest_distances < best_distances[query_ids]
+            best[query_ids[better]] = self.row_ids[start + nearest[better]]
+            best_distances[query_ids[better]] = nearest_distances[better]
+        return best, best_distances
+
+    def _arrays(self):
+        return {
+            "encodings": self.encodings,
+            "centroids": self.centroids,
+            "row_ids": self.row_ids,
+            "offsets": self.offsets,
+        }
+
+    def _restore(self, arrays):
+        super()._restore(arrays)
+        self.centroids = arrays["centroids"]
+        self.row_ids = arrays["row_ids"]
+        self.offsets = arrays["offsets"]
+        self._lists = self.encodings[self.row_ids]
+        self._lists_sq = self._encodings_sq[self.row_ids]
+
+
+INDEX_TYPES = {
+    BruteForceIndex.kind: BruteForceIndex,
+    IVFIndex.kind: IVFIndex,
+}
+DEFAULT_INDEX = BruteForceIndex.kind
+
+
+def check_index_params(kind, params):
+    # Extra keyword arguments of the recognition functions end up here, an
+    # unknown name (a misspelling, or a setting that belongs in one of the
+    # option objects) fails before any video or camera is opened
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    accepted = [name for name in inspect.signature(INDEX_TYPES[kind].__init__).parameters if name != "self"]
+    unknown = sorted(set(params) - set(accepted))
+    if unknown:
+        raise TypeError(
+            f"Unknown option {', '.join(unknown)} for the {kind} index (accepted: {', '.join(accepted) or 'none'}). "
+            "Detection, output, frame range and motion settings are passed as option objects."
+        )
+
+
+def make_index(kind=DEFAULT_INDEX, **params):
+    check_index_params(kind, params)
+    return INDEX_TYPES[kind](**params)
+
+
+def load_or_build_index(encodings, kind=DEFAULT_INDEX, store_dir=None, **params):
+    index = make_index(kind, **params)
+    if store_dir is None:
+        return index.build(encodings)
+
+    # The saved index is reused only if it was built from the same gallery rows
+    # with the same build parameters
+    index_path = os.path.join(store_dir, INDEX_FILE.format(kind=kind))
+    fingerprint = gallery_fingerprint(encodings)
+    if os.path.exists(index_path):
+        try:
+            saved = type(index).load(index_path, **params)
+            if saved.fingerprint == fingerprint and saved.built_params == saved.params():
+                return saved
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index.build(encodings)
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    index.save(index_path)
+    return index
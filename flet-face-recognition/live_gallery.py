@@ -0,0 +1,158 @@
+import os
+import numpy as np
+from engine import FaceRecognizer
+from gallery import ENCODING_SIZE, GalleryStore
+from gallery_index import BruteForceIndex, load_or_build_index
+from matching import FaceMatcher
+from templates import build_templates
+from utils import get_identity_name
+
+
+def _file_stamp(image_path):
+    stat = os.stat(image_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LiveRecognizer(FaceRecognizer):
+    # A FaceRecognizer whose identities can be added, removed and renamed while
+    # streams are running on it. Only new or changed images are encoded and
+    # only the identities they belong to get a new template. The new matcher is
+    # built on the side and swapped in with a single assignment: process_batch()
+    # reads the matcher once per batch, so frames in flight finish on the old
+    # one and none are dropped. Tracked faces keep their label until their
+    # track is refreshed.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.identities = {}  # name -> image paths
+        self._rows = {}  # image path -> (file stamp, store row or -1)
+        self._templates = {}  # name -> template rows
+        self._rejected = {}  # name -> outlier image paths
+        self._store = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_store"] = None  # reopened on the next update
+        return state
+
+    @property
+    def rejected(self):
+        return sorted(path for paths in self._rejected.values() for path in paths)
+
+    def names(self):
+        # Identities that can currently be recognized
+        return sorted(self._templates)
+
+    def load(self, image_paths):
+        # Makes the gallery exactly image_paths: images that are new or changed
+        # on disk are added, the ones no longer listed are removed
+        with self._lock:
+            wanted = set(image_paths)
+            stale = {path for path in self._rows if path not in wanted or self._rows[path][0] != _file_stamp(path)}
+            # Images changed on disk are encoded again under the name they had,
+            # which may come from rename()
+            names = self._path_names()
+            changed = self._remove_paths(stale)
+            new_paths = [path for path in dict.fromkeys(image_paths) if path not in self._rows]
+            changed |= self._add_paths(new_paths, names=names)
+            if changed or self.matcher is None:
+                self._update(changed)
+        return self
+
+    def add(self, image_paths, name=None):
+        # Images of new or existing identities, grouped like at load time
+        # unless name is given. Images already in the gallery keep their
+        # identity. Returns the names that changed.
+        if isinstance(image_paths, str):
+            image_paths = [image_paths]
+        with self._lock:
+            names = self._path_names()
+            changed = self._remove_paths(set(image_paths))
+            changed |= self._add_paths(list(dict.fromkeys(image_paths)), name, names)
+            self._update(changed)
+        return changed
+
+    def remove(self, name):
+        with self._lock:
+            if name not in self.identities:
+                raise ValueError(f"Unknown identity: {name}")
+            self._remove_paths(set(self.identities[name]))
+            self._update({name})
+
+    def rename(self, name, new_name):
+        # Renaming onto an existing identity merges the two
+        with self._lock:
+            if name not in self.identities:
+                raise ValueError(f"Unknown identity: {name}")
+            if new_name == name:
+                return
+            paths = self.identities.pop(name)
+            if new_name in self.identities:
+                self.identities[new_name].extend(paths)
+            else:
+                self.identities[new_name] = paths
+            self._update({name, new_name})
+
+    def _gallery_store(self):
+        if self._store is None:
+            self._store = GalleryStore(self.gallery_dir)
+        return self._store
+
+    def _path_names(self):
+        return {path: name for name, paths in self.identities.items() for path in paths}
+
+    def _add_paths(self, image_paths, name=None, names=None):
+        # names maps paths to the identity they had before, name overrides both
+        if not image_paths:
+            return set()
+        stamps = [_file_stamp(path) for path in image_paths]
+        rows = self._gallery_store().enroll(image_paths)
+        changed = set()
+        for path, stamp, row in zip(image_paths, stamps, rows):
+            identity = name or (names or {}).get(path) or get_identity_name(path, self.grouping)
+            self.identities.setdefault(identity, []).append(path)
+            self._rows[path] = (stamp, row)
+            changed.add(identity)
+        return changed
+
+    def _remove_paths(self, image_paths):
+        changed = set()
+        for name, paths in list(self.identities.items()):
+            kept = [path for path in paths if path not in image_paths]
+            if len(kept) == len(paths):
+                continue
+            changed.add(name)
+            if kept:
+                self.identities[name] = kept
+            else:
+                del self.identities[name]
+        for path in image_paths:
+            self._rows.pop(path, None)
+        return changed
+
+    def _update(self, changed):
+        # New templates for the changed identities, then the matcher swap
+        for name in changed:
+            paths = [path for path in self.identities.get(name, []) if self._rows[path][1] >= 0]
+            self._rejected.pop(name, None)
+            if not paths:
+                self._templates.pop(name, None)
+                continue
+            encodings = self._gallery_store().encodings_for([self._rows[path][1] for path in paths])
+            if self.max_medoids is None:
+                self._templates[name] = encodings
+                continue
+            template, _, rejected = build_templates(encodings, [name] * len(paths), self.max_medoids)
+            self._templates[name] = template
+            if rejected:
+                self._rejected[name] = [paths[i] for i in rejected]
+
+        names = sorted(self._templates)
+        known_names = [name for name in names for _ in range(len(self._templates[name]))]
+        if not names:
+            # Everyone was removed, every face is Unknown until someone is added
+            self.matcher = FaceMatcher(np.empty((0, ENCODING_SIZE)), [], self.tolerance, BruteForceIndex())
+            return
+        known_faces = np.vstack([self._templates[name] for name in names])
+        index = load_or_build_index(known_faces, self.index_kind, self.gallery_dir, **self.index_params)
+        self.matcher = FaceMatcher(known_faces, known_names, self.tolerance, index)
@@ -1,5 +1,5 @@
-import flet
-from ui import main
-
-if __name__ == "__main__":
+import flet
+from ui import main
+
+if __name__ == "__main__":
     flet.app(target=main)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import numpy as np
+from collections import namedtuple
+from gallery_index import BruteForceIndex
+
+DEFAULT_TOLERANCE = 0.50
+UNKNOWN_NAME = "Unknown"
+
+Match = namedtuple("Match", ["name", "distance", "confidence"])
+
+
+def distance_to_confidence(distance, tolerance=DEFAULT_TOLERANCE):
+    # Linear mapping: 1.0 for identical encodings, 0.5 at the tolerance, 0.0 at twice the tolerance
+    return float(np.clip(1.0 - distance / (2.0 * tolerance), 0.0, 1.0))
+
+
+class FaceMatcher:
+    def __init__(self, known_faces, known_names, tolerance=DEFAULT_TOLERANCE, index=None):
+        self.known_names = list(known_names)
+        self.tolerance = tolerance
+        # Any gallery index with a search() returning (rows, distances) can be plugged in
+        if index is None:
+            index = BruteForceIndex().build(np.asarray(known_faces, dtype=np.float64).reshape(len(self.known_names), -1))
+        self.index = index
+
+    def __len__(self):
+        return len(self.known_names)
+
+    def match(self, face_encodings):
+        if len(face_encodings) == 0:
+            return []
+        if not self.known_names:
+            return [Match(UNKNOWN_NAME, float("inf"), 0.0) for _ in face_encodings]
+
+        probes = np.asarray(face_encodings, dtype=np.float64).reshape(len(face_encodings), -1)
+        best, best_distances = self.index.search(probes)
+
+        matches = []
+        for index, distance in zip(best, best_distances):
+            distance = float(distance)
+            name = self.known_names[index] if distance <= self.tolerance else UNKNOWN_NAME
+            matches.append(Match(name, distance, distance_to_confidence(distance, self.tolerance)))
+        return matches
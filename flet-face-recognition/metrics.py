@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+
+STAGES = ("decode", "detect", "encode", "match", "draw", "imencode", "write", "latency")
+PERCENTILES = (50, 95, 99)
+
+
+class NullStats:
+    # Used when metrics are off, every call is a no-op without touching the clock
+    enabled = False
+
+    def clock(self):
+        return 0.0
+
+    def add_time(self, stage, start):
+        pass
+
+    def add_samples(self, samples):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def faces(self, count):
+        pass
+
+
+NULL_STATS = NullStats()
+
+
+class RecognitionStats:
+    # Per-stage latencies (a window of recent samples for percentiles plus
+    # running totals) and counters for the recognition loops. Stage timing is
+    # two calls per stage: start = stats.clock() ... stats.add_time(stage, start).
+    enabled = True
+
+    def __init__(self, window=2048):
+        self._lock = threading.Lock()  # the webcam stages record from several threads
+        self.window = window
+        self.started = time.monotonic()
+        self.counters = {"frames_in": 0, "frames_processed": 0, "frames_dropped": 0, "faces": 0}
+        self._samples = {}
+        self._totals = {}
+        self._faces_per_frame = deque(maxlen=window)
+
+    def clock(self):
+        return time.perf_counter()
+
+    def add_time(self, stage, start):
+        self._add(stage, time.perf_counter() - start)
+
+    def _add(self, stage, seconds):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            self._samples[stage].append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def add_samples(self, samples):
+        # (stage, seconds) pairs recorded elsewhere, e.g. in a worker process
+        for stage, seconds in samples:
+            self._add(stage, seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def faces(self, count):
+        with self._lock:
+            self.counters["faces"] += count
+            self._faces_per_frame.append(count)
+
+    def stage_seconds(self, stage):
+        with self._lock:
+            return self._totals.get(stage, [0, 0.0])[1]
+
+    def snapshot(self):
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            totals = {stage: list(values) for stage, values in self._totals.items()}
+            counters = dict(self.counters)
+            faces_per_frame = np.array(self._faces_per_frame)
+
+        elapsed = time.monotonic() - self.started
+        stages = {}
+        for stage in sorted(samples, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+            count, seconds = totals[stage]
+            values = samples[stage] * 1000
+            stage_stats = {"count": count, "total_ms": seconds * 1000, "mean_ms": seconds * 1000 / count}
+            for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stage_stats[f"p{percentile}_ms"] = float(value)
+            stages[stage] = stage_stats
+
+        return {
+            "elapsed_seconds": elapsed,
+            "counters": counters,
+            "fps_in": counters["frames_in"] / elapsed if elapsed > 0 else 0.0,
+            "fps_processed": counters["frames_processed"] / elapsed if elapsed > 0 else 0.0,
+            "faces_per_frame": {
+                "mean": float(faces_per_frame.mean()) if len(faces_per_frame) else 0.0,
+                "max": int(faces_per_frame.max()) if len(faces_per_frame) else 0,
+            },
+            "stages": stages,
+        }
+
+    def to_prometheus(self, prefix="face_recognition"):
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        lines.append(f"# TYPE {prefix}_faces_per_frame gauge")
+        lines.append(f"{prefix}_faces_per_frame {snapshot['faces_per_frame']['mean']}")
+        lines.append(f"# TYPE {prefix}_stage_seconds summary")
+        for stage, stage_stats in snapshot["stages"].items():
+            for percentile in PERCENTILES:
+                quantile = percentile / 100
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stage_stats[f"p{percentile}_ms"] / 1000}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stage_stats["total_ms"] / 1000}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stage_stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # Prometheus text format for .prom/.txt files, JSON otherwise
+        if path.endswith((".prom", ".txt")):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+class SampleRecorder(NullStats):
+    # Collects raw (stage, seconds) samples in worker processes to be merged into
+    # the parent's RecognitionStats with add_samples()
+    enabled = True
+
+    def __init__(self):
+        self.samples = []
+        self.face_counts = []
+
+    def clock(self):
+        return time.perf_counter()
+
+    def add_time(self, stage, start):
+        self.samples.append((stage, time.perf_counter() - start))
+
+    def faces(self, count):
+        self.face_counts.append(count)
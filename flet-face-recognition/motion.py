@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+DEFAULT_MOTION_THRESHOLD = 0.005  # fraction of thumbnail pixels that must change
+DEFAULT_MOTION_CHECK_EVERY = 25  # skipped frames after which one is detected anyway
+THUMBNAIL_WIDTH = 64
+PIXEL_DELTA = 12  # gray levels a thumbnail pixel must change by to count
+
+
+class MotionGate:
+    # Cheap pre-filter in front of face detection for mostly static footage.
+    # Every candidate frame is shrunk to a tiny grayscale thumbnail and compared
+    # with the thumbnail of the last detected frame; detection only runs when
+    # enough of it changed, while faces are being tracked, or after check_every
+    # frames without a detection (someone standing perfectly still). Frames
+    # that detect_every already skips are never shown to the gate.
+    # threshold is the sensitivity: lower detects on smaller motion.
+
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, check_every=DEFAULT_MOTION_CHECK_EVERY):
+        self.threshold = threshold
+        self.check_every = check_every
+        self.active = False  # faces seen at the last detection, set by the caller
+        self.skipped = 0  # frames since the last detection
+        self._reference = None
+        self._small = None
+        self._gray = None
+        self._diff = None
+
+    def _thumbnail(self, frame):
+        # Into reused buffers, this runs on every frame
+        height, width = frame.shape[:2]
+        size = (THUMBNAIL_WIDTH, max(1, int(round(height * THUMBNAIL_WIDTH / width))))
+        self._small = cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        if self._small.ndim == 2:
+            return self._small
+        self._gray = cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+    def should_detect(self, frame):
+        thumbnail = self._thumbnail(frame)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            detect = True
+        elif self.active or self.skipped + 1 >= self.check_every:
+            detect = True
+        else:
+            self._diff = cv2.absdiff(thumbnail, self._reference, dst=self._diff)
+            detect = np.count_nonzero(self._diff > PIXEL_DELTA) >= self.threshold * self._diff.size
+
+        if detect:
+            # Motion is measured against the last detected frame, so slow
+            # changes add up instead of slipping through frame by frame
+            if self._reference is None or self._reference.shape != thumbnail.shape:
+                self._reference = thumbnail.copy()
+            else:
+                np.copyto(self._reference, thumbnail)
+            self.skipped = 0
+        else:
+            self.skipped += 1
+        return detect
+
+
+class MotionOptions:
+    # Settings of the motion gate, every stream gets a gate of its own
+
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, check_every=DEFAULT_MOTION_CHECK_EVERY):
+        self.threshold = threshold
+        self.check_every = check_every
+
+
+def make_motion_gate(motion):
+    # motion=None turns the gate off
+    return MotionGate(motion.threshold, motion.check_every) if motion is not None else None
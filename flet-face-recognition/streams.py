@@ -0,0 +1,118 @@
+import threading
+import time
+import cv2
+import numpy as np
+from metrics import NULL_STATS
+
+
+class FrameSlot:
+    # Bounded hand-off between pipeline stages that holds only the newest item.
+    # A producer never blocks, an item the consumer did not pick up in time is
+    # replaced (and counted as dropped) instead of queueing up stale frames.
+    # In buffer pool mode every consumer copies frames out with get_into(), so
+    # the frame a put() replaces is free and the producer writes the next one
+    # into it.
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._time = 0.0  # when the item was put, for latency measurements
+        self._seq = 0
+        self._taken_seq = 0
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        # Returns the item it replaced
+        with self._condition:
+            replaced = self._item
+            if replaced is not None and self._taken_seq < self._seq:
+                self.dropped += 1
+            self._item = item
+            self._time = time.monotonic()
+            self._seq += 1
+            self._condition.notify_all()
+            return replaced
+
+    def get(self, last_seq=0, timeout=None):
+        # Wait for an item newer than last_seq, returns (seq, item) or (last_seq, None)
+        seq, item, _ = self.get_timed(last_seq, timeout)
+        return seq, item
+
+    def get_timed(self, last_seq=0, timeout=None):
+        # Like get(), plus the time.monotonic() at which the item was put
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or self.closed, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None, None
+            self._taken_seq = self._seq
+            return self._seq, self._item, self._time
+
+    def get_into(self, out, last_seq=0, timeout=None):
+        # Like get_timed(), but copies the frame into out under the lock. out is
+        # the consumer's own buffer, a new one is only made when it is None or
+        # the frame size changed. Returns (seq, buffer, time) or (last_seq, None, None).
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or self.closed, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None, None
+            self._taken_seq = self._seq
+            if out is None or out.shape != self._item.shape or out.dtype != self._item.dtype:
+                out = np.empty_like(self._item)
+            np.copyto(out, self._item)
+            return self._seq, out, self._time
+
+    def latest(self):
+        with self._condition:
+            return self._seq, self._item
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    # Reads a capture device as fast as it delivers frames so its buffer never
+    # fills up with stale frames, consumers always get the latest one. With
+    # buffer_pool every read goes into the frame the previous put() gave back,
+    # consumers must then take frames with get_into().
+
+    def __init__(self, source, stop_event, width=None, height=None, stats=NULL_STATS, buffer_pool=False):
+        super().__init__(daemon=True)
+        self.source = source
+        self.stop_event = stop_event
+        self.stats = stats
+        self.buffer_pool = buffer_pool
+        self.frames = FrameSlot()
+        self.capture = cv2.VideoCapture(source)
+        if width:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def release(self):
+        # Only for a capture that is never started, run() releases it otherwise
+        self.capture.release()
+
+    def run(self):
+        spare = None
+        try:
+            while not self.stop_event.is_set():
+                start = self.stats.clock()
+                ret, frame = self.capture.read(spare)
+                if not ret:
+                    break
+                self.stats.add_time("decode", start)
+                self.stats.count("frames_in")
+                if frame is not spare:
+                    self.stats.count("frame_allocations")
+                replaced = self.frames.put(frame)
+                if self.buffer_pool:
+                    spare = replaced
+        finally:
+            self.capture.release()
+            self.frames.close()
@@ -0,0 +1,82 @@
+import numpy as np
+
+DEFAULT_MAX_MEDOIDS = 3
+OUTLIER_MADS = 3.0  # robust z-score above which an image is rejected
+MIN_SPREAD = 0.03  # floor for the spread of very tight clusters
+MIN_CLUSTER_SIZE = 2  # photos a sub-cluster needs to get a medoid
+MAX_ITERATIONS = 20
+
+
+def _medoids(encodings, centroid, count):
+    # Representative real encodings that cover the identity's variation (pose,
+    # glasses, lighting): k-medoids, each medoid is the photo with the smallest
+    # total distance to the others in its sub-cluster, not an extreme one.
+    # Sub-clusters of a single photo get no medoid, they would only widen the
+    # region the identity accepts.
+    count = min(count, len(encodings) // MIN_CLUSTER_SIZE)
+    if count <= 0:
+        return []
+    distances = np.linalg.norm(encodings[:, None, :] - encodings[None, :, :], axis=2)
+
+    # Spread out starting points: the photo closest to the centroid, then each
+    # time the one farthest from those already chosen
+    chosen = [int(np.argmin(np.linalg.norm(encodings - centroid, axis=1)))]
+    while len(chosen) < count:
+        chosen.append(int(np.argmax(distances[:, chosen].min(axis=1))))
+
+    for _ in range(MAX_ITERATIONS):
+        labels = np.argmin(distances[:, chosen], axis=1)
+        medoids = []
+        for cluster, medoid in enumerate(chosen):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                medoid = int(members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))])
+            medoids.append(medoid)
+        if medoids == chosen:
+            break
+        chosen = medoids
+
+    labels = np.argmin(distances[:, chosen], axis=1)
+    return [medoid for cluster, medoid in enumerate(chosen) if np.count_nonzero(labels == cluster) >= MIN_CLUSTER_SIZE]
+
+
+def reject_outliers(encodings):
+    # Boolean mask of the encodings to keep. Needs at least three images,
+    # with fewer there is no majority to tell which one is wrong.
+    if len(encodings) < 3:
+        return np.ones(len(encodings), dtype=bool)
+    distances = np.linalg.norm(encodings - np.median(encodings, axis=0), axis=1)
+    median = np.median(distances)
+    spread = max(np.median(np.abs(distances - median)) * 1.4826, MIN_SPREAD)
+    return distances <= median + OUTLIER_MADS * spread
+
+
+def build_templates(encodings, names, max_medoids=DEFAULT_MAX_MEDOIDS):
+    # Turns one row per image into a compact template per identity: the
+    # centroid of its images plus up to max_medoids medoids, after rejecting
+    # images that do not look like the others (wrong person in the photo,
+    # failed detection). Returns (template encodings, names, rejected indexes).
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(len(names), -1)
+    groups = {}
+    for i, name in enumerate(names):
+        groups.setdefault(name, []).append(i)
+
+    template_rows = []
+    template_names = []
+    rejected = []
+    for name, indexes in groups.items():
+        group = encodings[indexes]
+        keep = reject_outliers(group)
+        rejected.extend(index for index, kept in zip(indexes, keep) if not kept)
+        group = group[keep]
+
+        if len(group) == 1:
+            rows = [group[0]]
+        else:
+            centroid = group.mean(axis=0)
+            rows = [centroid] + [group[i] for i in _medoids(group, centroid, max_medoids)]
+        template_rows.extend(rows)
+        template_names.extend([name] * len(rows))
+
+    template_faces = np.array(template_rows).reshape(-1, encodings.shape[1])
+    return template_faces, template_names, sorted(rejected)
@@ -0,0 +1,106 @@
+import itertools
+
+DEFAULT_REFRESH_EVERY = 15
+
+
+def box_iou(box_a, box_b):
+    top_a, right_a, bottom_a, left_a = box_a
+    top_b, right_b, bottom_b, left_b = box_b
+    width = min(right_a, right_b) - max(left_a, left_b)
+    height = min(bottom_a, bottom_b) - max(top_a, top_b)
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    area_a = (right_a - left_a) * (bottom_a - top_a)
+    area_b = (right_b - left_b) * (bottom_b - top_b)
+    return intersection / float(area_a + area_b - intersection)
+
+
+def box_center_distance(box_a, box_b):
+    # Distance between box centers relative to the width of the first box
+    top_a, right_a, bottom_a, left_a = box_a
+    top_b, right_b, bottom_b, left_b = box_b
+    dx = (left_a + right_a - left_b - right_b) / 2.0
+    dy = (top_a + bottom_a - top_b - bottom_b) / 2.0
+    return (dx * dx + dy * dy) ** 0.5 / max(1, right_a - left_a)
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.match = None
+        self.matched_at = None  # tracker update count of the last encoding
+        self.missed = 0
+
+
+class FaceTracker:
+    # Associates face boxes across detections so a face that stays in view keeps
+    # its identity. Only new tracks and tracks older than refresh_every updates
+    # need to be encoded and matched again.
+
+    def __init__(self, refresh_every=DEFAULT_REFRESH_EVERY, iou_threshold=0.3, max_center_distance=0.5, max_missed=3):
+        self.refresh_every = refresh_every
+        self.iou_threshold = iou_threshold
+        self.max_center_distance = max_center_distance
+        self.max_missed = max_missed
+        self.tracks = []
+        self.updates = 0
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        self.tracks = []
+
+    def _associate(self, face_locations):
+        # Greedy association, best IoU pairs first, then center distance for
+        # fast moving faces whose boxes no longer overlap enough
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for f, box in enumerate(face_locations):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((0, -iou, t, f))
+                else:
+                    distance = box_center_distance(track.box, box)
+                    if distance <= self.max_center_distance:
+                        pairs.append((1, distance, t, f))
+        pairs.sort()
+
+        assigned = {}
+        used_tracks = set()
+        for _, _, t, f in pairs:
+            if t in used_tracks or f in assigned:
+                continue
+            used_tracks.add(t)
+            assigned[f] = self.tracks[t]
+        return assigned
+
+    def update(self, face_locations):
+        self.updates += 1
+        assigned = self._associate(face_locations)
+
+        tracks = []
+        for f, box in enumerate(face_locations):
+            track = assigned.get(f)
+            if track is None:
+                track = Track(next(self._ids), box)
+                self.tracks.append(track)
+            track.box = box
+            track.missed = 0
+            tracks.append(track)
+
+        # Forget tracks that have not been seen for a few detections
+        seen = set(id(track) for track in tracks)
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        return tracks
+
+    def needs_encoding(self, track):
+        return track.matched_at is None or self.updates - track.matched_at >= self.refresh_every
+
+    def assign(self, track, match, updates=None):
+        # updates is the tracker update the face was encoded at, when assigned later
+        track.match = match
+        track.matched_at = self.updates if updates is None else updates
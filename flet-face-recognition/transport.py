@@ -0,0 +1,138 @@
+import base64
+import threading
+import time
+import cv2
+from streams import FrameSlot
+from metrics import NULL_STATS
+
+DEFAULT_DISPLAY_WIDTH = 640
+DEFAULT_TARGET_BYTES = 60000
+
+
+class FrameTransport:
+    # Sends annotated frames to the UI as base64 JPEG. Frames are handed over
+    # through a FrameSlot to a sender thread, so while the UI is still busy with
+    # the previous frame newer ones replace each other and are never encoded.
+    # JPEG quality adapts to keep frames around target_bytes.
+    # With buffer_pool, send() hands back a frame buffer the caller can draw the
+    # next frame into, and the sender scales into a buffer of its own. With
+    # jpeg_view, update_frame gets a memoryview of the JPEG bytes instead of a
+    # base64 string, valid only during the call.
+
+    def __init__(self, update_frame, display_width=DEFAULT_DISPLAY_WIDTH, target_bytes=DEFAULT_TARGET_BYTES,
+                 quality=80, min_quality=30, max_quality=90, quality_step=5, buffer_pool=False, jpeg_view=False):
+        self.update_frame = update_frame
+        self.display_width = display_width
+        self.target_bytes = target_bytes
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.quality_step = quality_step
+        self.buffer_pool = buffer_pool
+        self.jpeg_view = jpeg_view
+
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.last_bytes = 0
+        self.last_encode_ms = 0.0
+        self.total_encode_ms = 0.0
+        self.stats_recorder = NULL_STATS  # the recognition loop's RecognitionStats, if any
+
+        self._frames = FrameSlot()
+        self._frame = None  # buffer pool: the frame being encoded
+        self._display = None  # buffer pool: the frame scaled to the display width
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def frames_skipped(self):
+        return self._frames.dropped
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._frames.close()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def send(self, frame):
+        # Never blocks, the sender thread picks up the newest frame when it is
+        # free. In buffer pool mode returns a free frame buffer, or None.
+        replaced = self._frames.put(frame)
+        return replaced if self.buffer_pool else None
+
+    def encode(self, frame):
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self.display_width and width > self.display_width:
+            # Scale down to the size it is displayed at before encoding
+            display_height = int(height * self.display_width / width)
+            dst = self._display if self.buffer_pool else None
+            frame = cv2.resize(frame, (self.display_width, display_height), dst=dst, interpolation=cv2.INTER_AREA)
+            if frame is not dst:
+                self.stats_recorder.count("frame_allocations")
+            if self.buffer_pool:
+                self._display = frame
+
+        # OpenCV has no imencode into a given buffer, this allocation stays
+        _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self.stats_recorder.count("frame_allocations")
+        if self.jpeg_view:
+            encoded = memoryview(buffer)
+            self.last_bytes = buffer.size
+        else:
+            # b64encode reads the numpy buffer directly, no tobytes() copy, but
+            # the base64 bytes and the str decoded from them are two more
+            encoded = base64.b64encode(buffer).decode("ascii")
+            self.stats_recorder.count("frame_allocations", 2)
+            self.last_bytes = len(encoded)
+
+        self.last_encode_ms = (time.perf_counter() - start) * 1000
+        self.stats_recorder.add_time("imencode", start)
+        self.total_encode_ms += self.last_encode_ms
+        self._adapt_quality(buffer.size)
+        return encoded
+
+    def _adapt_quality(self, encoded_size):
+        if not self.target_bytes:
+            return
+        if encoded_size > self.target_bytes * 1.1:
+            self.quality = max(self.min_quality, self.quality - self.quality_step)
+        elif encoded_size < self.target_bytes * 0.8:
+            self.quality = min(self.max_quality, self.quality + self.quality_step)
+
+    def _run(self):
+        seq = 0
+        while not self._stop.is_set():
+            if self.buffer_pool:
+                seq, frame, _ = self._frames.get_into(self._frame, seq, timeout=0.5)
+            else:
+                seq, frame = self._frames.get(seq, timeout=0.5)
+            if frame is None:
+                if self._frames.closed:
+                    break
+                continue
+            if self.buffer_pool:
+                if frame is not self._frame:
+                    self.stats_recorder.count("frame_allocations")
+                self._frame = frame
+
+            encoded = self.encode(frame)
+            if callable(self.update_frame):
+                self.update_frame(encoded)
+            self.frames_sent += 1
+            self.bytes_sent += self.last_bytes
+
+    def stats(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "bytes_sent": self.bytes_sent,
+            "last_bytes": self.last_bytes,
+            "last_encode_ms": round(self.last_encode_ms, 2),
+            "avg_encode_ms": round(self.total_encode_ms / self.frames_sent, 2) if self.frames_sent else 0.0,
+            "quality": self.quality,
+        }
@@ -1,6 +1,23 @@
-import os
-
-def get_name_from_filename(image_path):
-    base_name = os.path.basename(image_path)
-    name, _ = os.path.splitext(base_name)
-    return name
\ No newline at end of file
+import os
+import re
+
+def get_name_from_filename(image_path):
+    base_name = os.path.basename(image_path)
+    name, _ = os.path.splitext(base_name)
+    return name
+
+IDENTITY_GROUPINGS = ("prefix", "folder", "file")
+
+def get_identity_name(image_path, grouping="prefix"):
+    # Several photos of one person become one identity:
+    # prefix: alice.jpg, alice2.jpg, alice_03.jpg -> alice
+    # folder: known/alice/1.jpg -> alice
+    # file: every file is its own identity, named like get_name_from_filename
+    if grouping == "folder":
+        return os.path.basename(os.path.dirname(os.path.abspath(image_path)))
+    name = get_name_from_filename(image_path)
+    if grouping == "prefix":
+        return re.sub(r"[\s_\-.(]*\d+\)?$", "", name) or name
+    if grouping == "file":
+        return name
+    raise ValueError(f"Unknown identity grouping: {grouping}")
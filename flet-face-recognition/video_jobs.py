@@ -0,0 +1,105 @@
+import os
+import json
+import cv2
+from appearances import AppearanceIndex
+
+DEFAULT_CHECKPOINT_EVERY = 1000  # frames
+CHECKPOINT_VERSION = 2
+
+
+class JobOptions:
+    # The part of a video to process (see resolve_frame_range) and, with a
+    # checkpoint_path, where progress is saved every checkpoint_every frames
+    # so a stopped job continues where it stopped
+
+    def __init__(self, start_frame=None, end_frame=None, start_time=None, end_time=None, checkpoint_path=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.start_time = start_time
+        self.end_time = end_time
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+
+
+def resolve_frame_range(frame_rate, length, start_frame=None, end_frame=None, start_time=None, end_time=None):
+    # Frame indexes work like a Python slice (start included, end excluded),
+    # times are in seconds. Returns the first and last frame number to
+    # process (numbered from 1, as everywhere else), last is None for "to the end".
+    if start_time is not None:
+        start_frame = int(round(start_time * frame_rate))
+    if end_time is not None:
+        end_frame = int(round(end_time * frame_rate))
+    first_frame = max(0, start_frame or 0) + 1
+    last_frame = end_frame
+    if last_frame is not None and length:
+        last_frame = min(last_frame, length)
+    if last_frame is not None and last_frame < first_frame:
+        raise ValueError(f"Empty frame range: {start_frame} to {end_frame}")
+    return first_frame, last_frame
+
+
+def split_frame_range(video_path, segments, start_frame=0, end_frame=None):
+    # (start_frame, end_frame) pairs covering the video in equal parts, each can
+    # be processed on its own and the results merged afterwards
+    input_movie = cv2.VideoCapture(video_path)
+    if not input_movie.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    length = int(input_movie.get(cv2.CAP_PROP_FRAME_COUNT))
+    input_movie.release()
+
+    end_frame = length if end_frame is None else min(end_frame, length)
+    step = max(1, -(-(end_frame - start_frame) // max(1, segments)))
+    return [(start, min(start + step, end_frame)) for start in range(start_frame, end_frame, step)]
+
+
+def load_checkpoint(checkpoint_path, video_path, first_frame, last_frame):
+    # The saved state of an interrupted job on the same video and range, or None
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return None
+    if checkpoint["video_path"] != os.path.abspath(video_path) or checkpoint["range"] != [first_frame, last_frame]:
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different video or frame range")
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, video_path, first_frame, last_frame, next_frame, found_names, output_state, appearances):
+    checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "video_path": os.path.abspath(video_path),
+        "range": [first_frame, last_frame],
+        "next_frame": next_frame,
+        "found_names": sorted(found_names),
+        "output": output_state,
+        "appearances": appearances.to_state() if appearances is not None else None,
+    }
+    checkpoint_dir = os.path.dirname(checkpoint_path)
+    if checkpoint_dir and not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def remove_checkpoint(checkpoint_path):
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def merge_appearance_indexes(index_paths, output_path, video_path=None, output_video_path=None):
+    # Appearance indexes of the segments of one video, intervals that touch at
+    # a segment boundary are joined
+    merged = None
+    for index_path in index_paths:
+        appearances = AppearanceIndex.load(index_path)
+        if merged is None:
+            merged = appearances
+        else:
+            merged.merge(appearances)
+    if merged is None:
+        raise ValueError("No appearance indexes to merge")
+    merged.save(output_path, video_path, output_video_path)
+    return merged
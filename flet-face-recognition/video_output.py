@@ -0,0 +1,248 @@
+import os
+import shutil
+import tempfile
+import subprocess
+from collections import deque
+import cv2
+
+# all: every frame, annotated (the default)
+# faces: only frames with faces
+# clips: a separate file per stretch of the video with faces
+# none: analysis only, nothing is drawn or written
+OUTPUT_MODES = ("all", "faces", "clips", "none")
+DEFAULT_CLIP_GAP = 1.0  # seconds without faces that end a clip
+
+
+class OutputOptions:
+    # What processing a video produces: frames by output_mode, clips split
+    # after clip_gap seconds without faces, and with appearances_path the
+    # appearance index (True saves it next to the output as <output>.faces.db)
+
+    def __init__(self, output_mode="all", clip_gap=DEFAULT_CLIP_GAP, appearances_path=None):
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode}")
+        self.output_mode = output_mode
+        self.clip_gap = clip_gap
+        self.appearances_path = appearances_path
+
+
+def open_video_writer(path, frame_rate, frame_size):
+    # Ensure the output directory exists
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writer = cv2.VideoWriter(path, fourcc, frame_rate, frame_size)
+    if not writer.isOpened():
+        raise ValueError(f"Could not create output video file: {path}")
+    return writer
+
+
+def clip_path(output_video_path, number):
+    base, ext = os.path.splitext(output_video_path)
+    return f"{base}_clip{number:03d}{ext or '.mp4'}"
+
+
+def part_path(output_video_path, number):
+    base, ext = os.path.splitext(output_video_path)
+    return f"{base}.part{number:04d}{ext or '.mp4'}"
+
+
+class VideoOutput:
+    # Writes the processed frames according to the output mode. paths lists
+    # the files written so far. With parts (used for checkpointed jobs) every
+    # split() closes the current file, so everything written up to a checkpoint
+    # is a complete file on disk, and finish() joins the parts. A clip that is
+    # open at a checkpoint goes on in its next part, clips lists the parts of
+    # every clip. Frames held back at a checkpoint go to a part of their own,
+    # which is dropped again if the clip ends without more faces.
+
+    def __init__(self, output_video_path, mode, frame_rate, frame_size, clip_gap=DEFAULT_CLIP_GAP, parts=False, state=None):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {mode}")
+        if mode != "none" and not output_video_path:
+            raise ValueError(f"Output mode {mode} needs an output video path")
+
+        self.output_video_path = output_video_path
+        self.mode = mode
+        self.frame_rate = frame_rate
+        self.frame_size = frame_size
+        self.parts = parts
+        state = state or {"paths": [], "clips": [], "in_clip": False, "gap": 0, "held_parts": 0}  # state() of an interrupted run
+        self.paths = list(state["paths"])
+        self.clips = [list(parts) for parts in state["clips"]]
+        self._writer = None
+        # Frames without faces are held back in clips mode, they are only
+        # written if faces come back within clip_gap
+        self._gap_frames = max(1, int(round(clip_gap * frame_rate))) if frame_rate > 0 else 25
+        self._held = deque()
+        self._in_clip = state["in_clip"]
+        self._gap = state["gap"]  # frames without faces since the last face in the clip
+        self._held_parts = state["held_parts"]  # last parts of the clip with held frames only
+
+        if mode in ("all", "faces") and not parts:
+            # Opened up front so a bad output path fails before any processing
+            self._open(output_video_path)
+
+    @property
+    def draws(self):
+        return self.mode != "none"
+
+    def _open(self, path):
+        self._writer = open_video_writer(path, self.frame_rate, self.frame_size)
+        self.paths.append(path)
+
+    def write(self, frame, has_faces):
+        if self.mode == "all" or (self.mode == "faces" and has_faces):
+            if self._writer is None:
+                self._open(part_path(self.output_video_path, len(self.paths) + 1))
+            self._writer.write(frame)
+        elif self.mode == "clips":
+            self._write_clip_frame(frame, has_faces)
+
+    def _write_clip_frame(self, frame, has_faces):
+        if has_faces:
+            if self._writer is None:
+                self._open_clip()
+            # Faces are back within the gap, the held frames belong to the clip
+            self._write_held()
+            self._writer.write(frame)
+            self._gap = 0
+            self._held_parts = 0
+        elif self._in_clip:
+            self._held.append(frame)
+            self._gap += 1
+            if self._gap >= self._gap_frames:
+                self._end_clip()
+
+    def _end_clip(self):
+        # The held frames are not part of the clip, also the ones in parts
+        self._held.clear()
+        self._release()
+        for _ in range(self._held_parts):
+            path = self.clips[-1].pop()
+            self.paths.remove(path)
+            os.remove(path)
+        self._held_parts = 0
+        self._in_clip = False
+
+    def _open_clip(self):
+        if not self._in_clip:
+            self._in_clip = True
+            self._gap = 0
+            if self.parts:
+                self.clips.append([])
+        if not self.parts:
+            self._open(clip_path(self.output_video_path, len(self.paths) + 1))
+            return
+        parts = self.clips[-1]
+        parts.append(part_path(clip_path(self.output_video_path, len(self.clips)), len(parts) + 1))
+        self._open(parts[-1])
+
+    def _write_held(self):
+        while self._held:
+            self._writer.write(self._held.popleft())
+
+    def _release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def split(self):
+        self._release()
+        if self._held:
+            self._open_clip()
+            self._write_held()
+            self._release()
+            self._held_parts += 1
+
+    def state(self):
+        return {
+            "paths": list(self.paths),
+            "clips": [list(parts) for parts in self.clips],
+            "in_clip": self._in_clip,
+            "gap": self._gap,
+            "held_parts": self._held_parts,
+        }
+
+    def close(self):
+        self._held.clear()
+        self._release()
+
+    def finish(self):
+        if self._in_clip:
+            self._end_clip()
+        self.close()
+        if not self.parts:
+            return
+        if self.mode in ("all", "faces") and self.paths:
+            join_videos(self.paths, self.output_video_path)
+            self.paths = [self.output_video_path]
+        elif self.mode == "clips":
+            self.paths = [clip_path(self.output_video_path, number) for number in range(1, len(self.clips) + 1)]
+            for parts, path in zip(self.clips, self.paths):
+                join_videos(parts, path)
+            self.clips = []
+
+
+def join_videos(video_paths, output_video_path):
+    # Joins the parts of one output into output_video_path and removes them,
+    # a single part is only renamed
+    if len(video_paths) == 1:
+        os.replace(video_paths[0], output_video_path)
+        return
+    concatenate_videos(video_paths, output_video_path)
+    for path in video_paths:
+        os.remove(path)
+
+
+def _concatenate_streams(video_paths, output_video_path):
+    # ffmpeg's concat demuxer copies the compressed streams, which needs
+    # inputs with the same codec and size. Returns False when it can not run.
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    output_dir = os.path.dirname(output_video_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    fd, list_path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for path in video_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        command = [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_video_path]
+        return subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+    finally:
+        os.remove(list_path)
+
+
+def concatenate_videos(video_paths, output_video_path):
+    # Frames of every input in order into one file. The streams are copied
+    # by ffmpeg when it is installed. OpenCV can not copy the compressed
+    # stream, without ffmpeg frames are decoded and encoded again.
+    if _concatenate_streams(video_paths, output_video_path):
+        return
+    output_movie = None
+    try:
+        for video_path in video_paths:
+            input_movie = cv2.VideoCapture(video_path)
+            if not input_movie.isOpened():
+                raise ValueError(f"Could not open video file: {video_path}")
+            try:
+                if output_movie is None:
+                    frame_size = (int(input_movie.get(cv2.CAP_PROP_FRAME_WIDTH)), int(input_movie.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                    output_movie = open_video_writer(output_video_path, input_movie.get(cv2.CAP_PROP_FPS), frame_size)
+                while True:
+                    ret, frame = input_movie.read()
+                    if not ret:
+                        break
+                    output_movie.write(frame)
+            finally:
+                input_movie.release()
+    finally:
+        if output_movie is not None:
+            output_movie.release()